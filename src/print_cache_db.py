@@ -5,16 +5,13 @@
 
 import pprint
 import sys
-if sys.version_info >= (3, 0, 0):
-    import dbm
-else:
-    import anydbm as dbm
+
+from pymor.core.cache import LimitedFileBackend
 
 
 def output(filename):
-    db = dbm.open(filename, 'r')
-    pprint.pprint(db.items())
-    db.close()
+    backend = LimitedFileBackend({'filename': filename})
+    pprint.pprint([(key, backend.get(key)) for key in backend.keys()])
 
 
 if __name__ == '__main__':
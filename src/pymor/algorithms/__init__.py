@@ -3,4 +3,6 @@
 # License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
 
 from .greedy import greedy
-from .basisextension import trivial_basis_extension, gram_schmidt_basis_extension
+from .basisextension import (trivial_basis_extension, gram_schmidt_basis_extension, pod_basis_extension,
+                             GramSchmidtBasisExtension)
+from .pod import pod
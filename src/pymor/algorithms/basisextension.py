@@ -6,9 +6,13 @@ from __future__ import absolute_import, division, print_function
 
 import numpy as np
 
+from pymor.core import defaults
 from pymor.core.exceptions import ExtensionError
+from pymor.core.interfaces import BasicInterface
 from pymor.tools import float_cmp_all
-from pymor.la import VectorArray, NumpyVectorArray, gram_schmidt, numpy_gram_schmidt
+from pymor.la import (VectorArray, NumpyVectorArray, gram_schmidt, block_gram_schmidt, numpy_gram_schmidt,
+                      orthonormalize_against)
+from pymor.algorithms.pod import pod
 
 
 def trivial_basis_extension(basis, U, U_ind=None, copy_basis=True, copy_U=True):
@@ -135,6 +139,192 @@ def gram_schmidt_basis_extension(basis, U, U_ind=None, product=None, copy_basis=
     return new_basis
 
 
+def pod_basis_extension(basis, U, U_ind=None, product=None, modes=None, energy_tol=None, method='snapshots',
+                        tol=None, copy_basis=True):
+    '''Extend basis with the POD modes of the projection errors of the new vectors.
+
+    The vectors `U[U_ind]` are projected onto the orthogonal complement of the
+    orthonormal basis. The projection errors are compressed with `pod` and the
+    resulting modes are appended to the basis and orthonormalized against it with
+    `block_gram_schmidt`. In this way several modes can be added in a single
+    `greedy` step, e.g. when `greedy` is called with `snapshots_per_extension > 1`.
+
+    Parameters
+    ----------
+    basis
+        The orthonormal basis to extend.
+    U
+        The new vectors.
+    U_ind
+        Indices of the new vectors in U.
+    product
+        The scalar product w.r.t. which to orthonormalize; if None, the l2-scalar
+        product on the coefficient vector is used.
+    modes
+        Maximum number of modes to add.
+    energy_tol
+        Tolerance for the relative energy of the discarded modes (see `pod`).
+    method
+        The method used by `pod`.
+    tol
+        Modes with singular values not larger than `tol` are not added. If None,
+        `defaults.gram_schmidt_tol` is used.
+    copy_basis
+        If copy_basis is False, the old basis is extended in-place.
+
+    Returns
+    -------
+    The new basis.
+
+    Raises
+    ------
+    ExtensionError
+        Is raised if no mode has been added.
+    '''
+    if basis is None:
+        basis = NumpyVectorArray(np.zeros((0, U.dim)))
+
+    basis_length = len(basis)
+
+    E = U.copy(ind=U_ind)
+    if basis_length > 0:
+        if product is None:
+            coefficients = basis.prod(E, pairwise=False)
+        else:
+            coefficients = product.apply2(basis, E, pairwise=False)
+        E.iadd_lincomb(-coefficients.T, basis)
+    POD, _ = pod(E, modes=modes, product=product, energy_tol=energy_tol, method=method,
+                 atol=defaults.gram_schmidt_tol if tol is None else tol)
+
+    new_basis = basis.copy() if copy_basis else basis
+    new_basis.append(POD)
+    block_gram_schmidt(new_basis, offset=basis_length, product=product, find_duplicates=False)
+
+    if len(new_basis) <= basis_length:
+        raise ExtensionError
+
+    return new_basis
+
+
+class GramSchmidtBasisExtension(BasicInterface):
+    '''Gram-Schmidt basis extension which keeps the basis and extends it in place.
+
+    In contrast to `gram_schmidt_basis_extension`, the orthonormal basis is owned by
+    this object and is neither copied nor orthonormalized again in each step. New
+    vectors are orthonormalized against the basis and each other with
+    `orthonormalize_against` and appended to the basis, for which space for
+    `reserve` vectors is allocated in advance. If a `product` is given, its
+    images of the basis vectors are kept as well, so that `product` is only applied
+    to the new vectors.
+
+    After each extension, `coefficients` holds the coefficients of the projections of
+    the new vectors onto the old basis and `norms` the norms of the added components,
+    i.e. the projection errors of the new vectors. Vectors for which this norm is
+    below `tol` are not added. The Gram matrix `gramian` of the basis is updated with
+    the scalar products of the new vectors, so that orthonormality can be monitored
+    via `orthonormality_error` without recomputing all products.
+
+    Instances can be used as `extension_algorithm` in `greedy`. A call returns a
+    shallow copy of the basis, which stays valid when the basis is extended later
+    and can be pickled like a deep copy.
+    If called with another basis than the one returned last, the state is reset
+    to this basis (see `reset`).
+
+    Parameters
+    ----------
+    product
+        The scalar product w.r.t. which to orthonormalize; if None, the l2-scalar
+        product on the coefficient vector is used.
+    tol
+        Vectors whose added component has a norm below `tol` are not added. If None,
+        `defaults.gram_schmidt_tol` is used.
+    reserve
+        Number of vectors for which space is allocated when the basis is created.
+    '''
+
+    def __init__(self, product=None, tol=None, reserve=0):
+        self.product = product
+        self.tol = defaults.gram_schmidt_tol if tol is None else tol
+        self.reserve = reserve
+        self.reset()
+
+    def reset(self, basis=None):
+        '''Discard the current basis and continue with an orthonormalized copy of `basis`.'''
+        self._basis = self._images = self._returned = None
+        self.gramian = np.zeros((0, 0))
+        self.coefficients = self.norms = None
+        if basis is not None:
+            self._allocate(basis)
+            if len(basis) > 0:
+                try:
+                    self.extend(basis)
+                except ExtensionError:
+                    pass
+
+    def _allocate(self, U):
+        self._basis = U.copy(ind=[])
+        self._basis.reserve(self.reserve)
+        if self.product is not None:
+            self._images = self.product.apply(self._basis)
+            self._images.reserve(self.reserve)
+
+    @property
+    def basis(self):
+        '''Shallow copy of the current basis.'''
+        return None if self._basis is None else self._basis.copy(deep=False)
+
+    @property
+    def orthonormality_error(self):
+        '''Maximum deviation of `gramian` from the identity matrix.'''
+        if len(self.gramian) == 0:
+            return 0.
+        return np.max(np.abs(self.gramian - np.eye(len(self.gramian))))
+
+    def extend(self, U, U_ind=None):
+        '''Extend the basis in place by the vectors `U[U_ind]`.
+
+        Returns
+        -------
+        The number of added vectors.
+
+        Raises
+        ------
+        ExtensionError
+            Is raised if no vector has been added.
+        '''
+        if self._basis is None:
+            self._allocate(U)
+        n = len(self._basis)
+        W = U.copy(ind=U_ind)
+        PW = None if self.product is None else self.product.apply(W)
+
+        self.coefficients, self.norms = orthonormalize_against(W, self._basis, product=self.product, tol=self.tol,
+                                                               images=PW, basis_images=self._images)
+        if len(W) == 0:
+            raise ExtensionError
+
+        self._basis.append(W)
+        if self._images is not None:
+            self._images.append(PW)
+
+        # only the scalar products of the new vectors need to be computed
+        C = self._basis.prod(self._basis if self._images is None else self._images, o_ind=range(n, len(self._basis)),
+                             pairwise=False)
+        G = np.empty((len(self._basis), len(self._basis)), dtype=np.result_type(self.gramian, C))
+        G[:n, :n] = self.gramian
+        G[:, n:] = C
+        G[n:, :n] = C[:n].T.conj()
+        self.gramian = G
+        return len(W)
+
+    def __call__(self, basis, U):
+        if basis is not self._returned:
+            self.reset(basis)
+        self.extend(U)
+        self._returned = self.basis
+        return self._returned
+
+
 def numpy_gram_schmidt_basis_extension(basis, U, product=None):
     '''Extend basis using Gram-Schmidt orthonormalization.
 
@@ -7,13 +7,14 @@ from __future__ import absolute_import, division, print_function
 import time
 from itertools import izip
 
-from pymor.core import getLogger
+from pymor.core import getLogger, defaults
 from pymor.core.exceptions import ExtensionError
 from pymor.algorithms.basisextension import trivial_basis_extension
 
 
 def greedy(discretization, reductor, samples, initial_data=None, use_estimator=True, error_norm=None,
-           extension_algorithm=trivial_basis_extension, target_error=None, max_extensions=None):
+           extension_algorithm=trivial_basis_extension, target_error=None, max_extensions=None,
+           snapshots_per_extension=1):
     '''Greedy extension algorithm.
 
     Parameters
@@ -47,6 +48,11 @@ def greedy(discretization, reductor, samples, initial_data=None, use_estimator=T
         drops below this value.
     max_extensions
         If not None, stop algorithm after `max_extensions` extension steps.
+    snapshots_per_extension
+        Number of parameters with the largest errors for which the solutions are
+        passed to `extension_algorithm` in each step. Use an extension algorithm
+        which compresses the snapshots, e.g. `pod_basis_extension`, if this is
+        larger than one.
 
     Returns
     -------
@@ -85,10 +91,17 @@ def greedy(discretization, reductor, samples, initial_data=None, use_estimator=T
         logger.info('Estimating errors ...')
         if use_estimator:
             errors = [rd.estimate(rd.solve(mu), mu) for mu in samples]
-        elif error_norm is not None:
-            errors = [error_norm(discretization.solve(mu) - rc.reconstruct(rd.solve(mu))) for mu in samples]
         else:
-            errors = [(discretization.solve(mu) - rc.reconstruct(rd.solve(mu))).l2_norm() for mu in samples]
+            # solve in batches, so that only a bounded number of detailed solutions is kept in memory
+            errors = []
+            batch_size = defaults.greedy_solve_batch_size
+            for start in xrange(0, len(samples), batch_size):
+                batch = samples[start:start + batch_size]
+                U = discretization.solve_many(batch)
+                for i, mu in enumerate(batch):
+                    e = U.copy(ind=[i]) - rc.reconstruct(rd.solve(mu))
+                    errors.append(error_norm(e) if error_norm is not None else e.l2_norm())
+                del U
 
         max_err, max_err_mu = max(((err, mu) for err, mu in izip(errors, samples)), key=lambda t: t[0])
         max_errs.append(max_err)
@@ -99,8 +112,13 @@ def greedy(discretization, reductor, samples, initial_data=None, use_estimator=T
             logger.info('Reached maximal error on snapshots of {} <= {}'.format(max_err, target_error))
             break
 
-        logger.info('Extending with snapshot for mu = {}'.format(max_err_mu))
-        U = discretization.solve(max_err_mu)
+        if snapshots_per_extension == 1:
+            logger.info('Extending with snapshot for mu = {}'.format(max_err_mu))
+            U = discretization.solve(max_err_mu)
+        else:
+            worst = sorted(izip(errors, samples), key=lambda t: t[0], reverse=True)[:snapshots_per_extension]
+            logger.info('Extending with snapshots for the {} parameters with largest errors'.format(len(worst)))
+            U = discretization.solve_many(mu for _, mu in worst)
         try:
             data = extension_algorithm(data, U)
         except ExtensionError:
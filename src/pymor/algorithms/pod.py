@@ -0,0 +1,124 @@
+# This file is part of the pyMor project (http://www.pymor.org).
+# Copyright Holders: Felix Albrecht, Rene Milk, Stephan Rave
+# License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from pymor.core import defaults
+from pymor.la import gram_schmidt
+
+
+def pod(A, modes=None, product=None, energy_tol=None, rtol=None, atol=0., method='snapshots', oversampling=10,
+        power_iterations=2, orthonormalize=True):
+    '''Proper orthogonal decomposition of the vectors in `A`.
+
+    Computes the POD modes, i.e. the left singular vectors of the matrix whose columns
+    are the vectors of `A`, and the corresponding singular values w.r.t. `product`.
+
+    With `method='snapshots'`, the method of snapshots is used: the singular values and
+    the coefficients of the modes w.r.t. `A` are obtained from the eigenvalue
+    decomposition of the Gram matrix `A.gramian()` (or `product.apply2(A, A)`), so
+    the costs are dominated by the `len(A)**2` scalar products.
+
+    With `method='randomized'`, `modes + oversampling` random linear combinations of
+    the vectors are improved by `power_iterations` power iterations and orthonormalized.
+    The singular value decomposition is then computed in the span of these vectors. The
+    costs grow only linearly with `len(A)`, which pays off for very large snapshot sets.
+    `modes` has to be given in this case.
+
+    The number of modes is limited by `modes`. If `energy_tol` is given, only the
+    smallest number of modes is kept for which the discarded energy, i.e. the sum of
+    the squared singular values of the discarded modes, is at most `energy_tol` times
+    the total energy `sum(A.l2_norm()**2)`. Modes with singular values not larger than
+    `rtol` times the largest singular value or not larger than `atol` are always
+    discarded.
+
+    Parameters
+    ----------
+    A
+        The `VectorArray` of which the POD is computed.
+    modes
+        Maximum number of modes.
+    product
+        The scalar product w.r.t. which the POD is computed; if None, the l2-scalar
+        product on the coefficient vector is used.
+    energy_tol
+        Tolerance for the relative energy of the discarded modes.
+    rtol
+        Relative tolerance for the singular values. If None, `defaults.pod_rtol` is used.
+    atol
+        Absolute tolerance for the singular values.
+    method
+        Either 'snapshots' or 'randomized'.
+    oversampling
+        Number of additional random vectors for the randomized method.
+    power_iterations
+        Number of power iterations for the randomized method.
+    orthonormalize
+        If True, the modes obtained with the method of snapshots are orthonormalized
+        again with `gram_schmidt`, since they lose orthogonality for small singular values.
+
+    Returns
+    -------
+    modes
+        `VectorArray` of the POD modes.
+    singular_values
+        The corresponding singular values in descending order.
+    '''
+    assert method in ('snapshots', 'randomized')
+    rtol = defaults.pod_rtol if rtol is None else rtol
+
+    # the total energy is only needed for truncation w.r.t. energy_tol
+    if energy_tol is None:
+        energy = None
+    elif product is None:
+        energy = np.sum(A.l2_norm() ** 2)
+    else:
+        energy = np.sum(np.abs(product.apply2(A, A, pairwise=True)))
+
+    if method == 'snapshots':
+        # gramian only computes the blocks on and above the diagonal
+        G = A.gramian() if product is None else product.apply2(A, A, pairwise=False)
+        evals, evecs = np.linalg.eigh(G)
+        evals, evecs = evals[::-1], evecs[:, ::-1]
+        singular_values = np.sqrt(np.maximum(evals, 0))
+        r = _truncation(singular_values, energy, modes, energy_tol, rtol, atol)
+        singular_values = singular_values[:r]
+        POD = A.lincomb((evecs[:, :r] / singular_values).T)
+        if orthonormalize:
+            POD = gram_schmidt(POD, product=product, find_duplicates=False)
+    else:
+        assert modes is not None
+        Q = A.lincomb(np.random.randn(min(modes + oversampling, len(A)), len(A)))
+        for _ in xrange(power_iterations):
+            Q = gram_schmidt(Q, product=product, find_duplicates=False, check=False)
+            Q = A.lincomb(_products(A, Q, product).T)
+        Q = gram_schmidt(Q, product=product, find_duplicates=False, check=False)
+        U, singular_values, _ = np.linalg.svd(_products(Q, A, product), full_matrices=False)
+        r = _truncation(singular_values, energy, modes, energy_tol, rtol, atol)
+        singular_values = singular_values[:r]
+        POD = Q.lincomb(U[:, :r].T)
+
+    return POD, singular_values
+
+
+def _products(V, U, product):
+    if product is None:
+        return V.prod(U, pairwise=False)
+    return product.apply2(V, U, pairwise=False)
+
+
+def _truncation(singular_values, energy, modes, energy_tol, rtol, atol):
+    '''Number of modes to keep (see `pod`).'''
+    if len(singular_values) == 0:
+        return 0
+    r = np.count_nonzero(singular_values > max(rtol * singular_values[0], atol))
+    if modes is not None:
+        r = min(r, modes)
+    if energy_tol is not None:
+        sufficient = np.flatnonzero(energy - np.cumsum(singular_values ** 2) <= energy_tol * energy)
+        if len(sufficient) > 0:
+            r = min(r, sufficient[0] + 1)
+    return r
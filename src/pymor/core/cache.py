@@ -3,22 +3,33 @@
 # License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
 
 from __future__ import absolute_import, division, print_function
-#cannot use unicode_literals here, or else dbm backend fails
 from functools import partial
 from dogpile import cache as dc
-from dogpile.cache.backends.file import DBMBackend
 from os.path import join
 from tempfile import gettempdir
 from collections import OrderedDict
+from itertools import izip
 from pprint import pformat
 import sys
 import os
-from collections import deque
+from contextlib import contextmanager
 import uuid
+import fcntl
+import hashlib
+import time
+import types
+import threading
+import atexit
+import Queue
+from weakref import WeakSet
+from numbers import Number
+
+import numpy as np
+from scipy.sparse import issparse
 
 import pymor.core
-from pymor.core.interfaces import BasicInterface
-from pymor.tools import memory
+from pymor.core.interfaces import BasicInterface, abstractmethod
+from pymor.core.defaults import defaults
 
 
 NO_CACHE_CONFIG = {"backend": 'Dummy'}
@@ -26,126 +37,1078 @@ DEFAULT_MEMORY_CONFIG = {"backend": 'LimitedMemory', 'arguments.max_kbytes': 200
 SMALL_MEMORY_CONFIG = {"backend": 'LimitedMemory', 'arguments.max_keys': 20,
                        'arguments.max_kbytes': 20}
 DEFAULT_DISK_CONFIG = {"backend": 'LimitedFile',
-                       "arguments.filename": join(gettempdir(), 'pymor.cache.dbm'),
+                       "arguments.filename": join(gettempdir(), 'pymor.cache'),
                        'arguments.max_keys': 2000}
 SMALL_DISK_CONFIG = {"backend": 'LimitedFile',
-                     "arguments.filename": join(gettempdir(), 'pymor.small_cache.dbm'),
+                     "arguments.filename": join(gettempdir(), 'pymor.small_cache'),
                      'arguments.max_keys': 20}
+TIERED_CONFIG = {"backend": 'Tiered',
+                 'arguments.memory': {'max_kbytes': 20000},
+                 'arguments.disk': {'filename': join(gettempdir(), 'pymor.tiered_cache'), 'max_keys': 2000}}
+SHARED_MEMORY_CONFIG = {"backend": 'SharedMemory',
+                        "arguments.path": join('/dev/shm' if os.path.isdir('/dev/shm') else gettempdir(),
+                                               'pymor.shared_cache'),
+                        'arguments.max_kbytes': 1000000}
 
 NO_VALUE = dc.api.NO_VALUE
 
 
-class DummyBackend(BasicInterface, dc.api.CacheBackend):
+class CacheBackendInterface(BasicInterface, dc.api.CacheBackend):
+    '''Base class for pyMor's cache backends which keeps track of usage statistics.
+
+    Implementors have to provide `_get`, `_set` and `_delete` instead of `get`, `set` and
+    `delete` and should call `_evicted` for each entry they remove in order to enforce their
+    limits. The number of bytes held by the backend is given by the `nbytes` property.
+    The metadata of the values found by the last `get` or `get_multi` call of the current
+    thread is available via `recent_hits`.
+    '''
+
+    _hits = _misses = _sets = _evictions = 0
+
+    @abstractmethod
+    def _get(self, key):
+        pass
+
+    @abstractmethod
+    def _set(self, key, value):
+        pass
+
+    @abstractmethod
+    def _delete(self, key):
+        pass
+
+    def _set_multi(self, mapping):
+        for key, value in mapping.iteritems():
+            self._set(key, value)
+
+    def _local(self):
+        local = self.__dict__.get('_recent')
+        if local is None:
+            local = self._recent = threading.local()
+        return local
+
+    def _get_counted(self, key):
+        # dogpile looks up a missing key again after acquiring the creation lock. This repeated
+        # lookup is not counted as another miss, and as a hit if the value has been created meanwhile.
+        local = self._local()
+        recheck = getattr(local, 'missed', None) == key
+        local.missed = None
+        value = self._get(key)
+        if value is dc.api.NO_VALUE:
+            local.missed = key
+            if not recheck:
+                self._misses += 1
+        else:
+            if recheck:
+                self._misses -= 1
+            self._hits += 1
+        return value
+
+    def _record_hits(self, keys, values):
+        self._local().hits = {key: getattr(value, 'metadata', None)
+                              for key, value in izip(keys, values) if value is not dc.api.NO_VALUE}
+
+    def get(self, key):
+        value = self._get_counted(key)
+        self._record_hits((key,), (value,))
+        return value
+
+    def get_multi(self, keys):
+        values = [self._get_counted(key) for key in keys]
+        self._record_hits(keys, values)
+        return values
+
+    def recent_hits(self):
+        '''Dict of the metadata of the values found by the last call of `get` or `get_multi`
+        in the current thread, keyed by their keys.'''
+        return getattr(self._local(), 'hits', {})
+
+    def set(self, key, value):
+        self._sets += 1
+        self._local().missed = None
+        self._set(key, value)
+
+    def set_multi(self, mapping):
+        '''Store several values at once. Backends can override `_set_multi` to do this in bulk.'''
+        self._sets += len(mapping)
+        self._local().missed = None
+        self._set_multi(mapping)
+
+    def delete(self, key):
+        self._delete(key)
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self._delete(key)
+
+    def _evicted(self, key):
+        self._evictions += 1
+
+    @property
+    def nbytes(self):
+        return 0
+
+    def statistics(self):
+        '''Returns a dict with the hit, miss, set and eviction counts and the bytes held by the backend.'''
+        return {'hits': self._hits, 'misses': self._misses, 'sets': self._sets, 'evictions': self._evictions,
+                'bytes': self.nbytes}
+
+
+class DummyBackend(CacheBackendInterface):
 
     def __init__(self, argument_dict):
         self.logger.debug('DummyBackend args {}'.format(pformat(argument_dict)))
 
-    def get(self, key):
+    def _get(self, key):
         return dc.api.NO_VALUE
 
-    def set(self, key, value):
+    def _set(self, key, value):
         pass
 
-    def delete(self, key):
+    def _delete(self, key):
         pass
 
 
-class LimitedMemoryBackend(BasicInterface, dc.api.CacheBackend):
+def _estimate_size(value):
+    '''Estimate the number of bytes held by a cached value.
+
+    The data buffers of numpy arrays, scipy.sparse matrices, `NumpyVectorArrays`
+    and `NumpyLinearOperators` are accounted for with their actual size. Containers
+    (including dogpile's `CachedValue`) are traversed recursively. For all other
+    objects `sys.getsizeof` is used.
+    '''
+    from pymor.la.numpyvectorarray import NumpyVectorArray
+    from pymor.operators.basic import NumpyLinearOperator
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    elif issparse(value):
+        return sum(getattr(value, a).nbytes for a in ('data', 'indices', 'indptr', 'row', 'col', 'offsets')
+                   if isinstance(getattr(value, a, None), np.ndarray))
+    elif isinstance(value, NumpyVectorArray):
+        return _estimate_size(value._array)
+    elif isinstance(value, NumpyLinearOperator):
+        return _estimate_size(value._matrix)
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in value)
+    elif isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_estimate_size(k) + _estimate_size(v) for k, v in value.iteritems())
+    else:
+        return sys.getsizeof(value)
+
+
+class LimitedMemoryBackend(CacheBackendInterface):
 
     def __init__(self, argument_dict):
         '''If argument_dict contains a value for max_kbytes this the total memory limit in kByte that is enforced on the
         internal cache dictionary, otherwise it's set to sys.maxint.
         If argument_dict contains a value for max_keys this maximum amount of cache values kept in the
         internal cache dictionary, otherwise it's set to sys.maxlen.
-        If necessary values are deleted from the cache in FIFO order.
+        If necessary values are deleted from the cache in LRU order. The size of each value is
+        determined once when it is stored (see `_estimate_size`), so all operations are O(1).
+        If the `evict_callback` attribute is set, it is called as `evict_callback(key, value)`
+        for each evicted entry. Entries can be excluded from eviction via `pin`.
         '''
         self.logger.debug('LimitedMemoryBackend args {}'.format(pformat(argument_dict)))
         self._max_keys = argument_dict.get('max_keys', sys.maxsize)
         self._max_bytes = argument_dict.get('max_kbytes', sys.maxint / 1024) * 1024
         self._cache = OrderedDict()
+        self._sizes = {}
+        self._current_bytes = 0
+        self._pinned = {}
+        self.evict_callback = None
 
-    def get(self, key):
-        return self._cache.get(key, dc.api.NO_VALUE)
+    def _get(self, key):
+        try:
+            value = self._cache.pop(key)
+        except KeyError:
+            return dc.api.NO_VALUE
+        # re-insert to mark the entry as most recently used
+        self._cache[key] = value
+        return value
+
+    @property
+    def nbytes(self):
+        return self._current_bytes
 
     def print_limit(self, additional_size=0):
         self.logger.info('LimitedMemoryBackend at {}({}) keys -- {}({}) Byte'
                          .format(len(self._cache), self._max_keys,
-                                 memory.getsizeof(self._cache) / 8, self._max_bytes))
+                                 self._current_bytes + additional_size, self._max_bytes))
 
-    def _enforce_limits(self, new_value):
-        additional_size = memory.getsizeof(new_value) / 8
-        while len(self._cache) > 0 and not (len(self._cache) <= self._max_keys and
-                                            (memory.getsizeof(self._cache) + additional_size) / 8 <= self._max_bytes):
-            self.logger.debug('shrinking limited memory cache')
-            self._cache.popitem(last=False)
+    def _within_limits(self, additional_size, additional_keys):
+        return (len(self._cache) + additional_keys <= self._max_keys
+                and self._current_bytes + additional_size <= self._max_bytes)
 
-    def set(self, key, value):
-        self._enforce_limits(value)
+    def _enforce_limits(self, additional_size, additional_keys=1):
+        # without pinned entries, the least recently used entry is always the first one
+        unpinned = (k for k in list(self._cache) if k not in self._pinned) if self._pinned else None
+        while len(self._cache) > 0 and not self._within_limits(additional_size, additional_keys):
+            key = next(iter(self._cache)) if unpinned is None else next(unpinned, None)
+            if key is None:
+                self.logger.debug('limits of limited memory cache exceeded by pinned entries')
+                break
+            self._evict(key)
+
+    def _evict(self, key):
+        self.logger.debug('shrinking limited memory cache')
+        value = self._cache.pop(key)
+        self._current_bytes -= self._sizes.pop(key)
+        self._evicted(key)
+        if self.evict_callback is not None:
+            self.evict_callback(key, value)
+
+    def pin(self, key):
+        '''Exclude the entry for `key` from eviction until `unpin` is called for it.
+
+        Pins are counted, i.e. the entry is unpinned by the last matching call of `unpin`.
+        Pinned entries still count towards the limits of the backend.
+        '''
+        self._pinned[key] = self._pinned.get(key, 0) + 1
+
+    def unpin(self, key):
+        count = self._pinned.pop(key) - 1
+        if count > 0:
+            self._pinned[key] = count
+        else:
+            self._enforce_limits(0, 0)
+
+    def is_pinned(self, key):
+        return key in self._pinned
+
+    def sizes(self):
+        '''Returns a dict of the estimated sizes in Byte of all cached entries (in LRU order).'''
+        return OrderedDict((key, self._sizes[key]) for key in self._cache)
+
+    def clear(self):
+        '''Remove all entries which are not pinned.'''
+        for key in [k for k in self._cache if k not in self._pinned]:
+            self._delete(key)
+
+    def _set(self, key, value):
+        if key in self._cache:
+            self._delete(key)
+        size = _estimate_size(value)
+        if size > self._max_bytes:
+            self.logger.debug('value of size {} Byte exceeds cache limit, not caching'.format(size))
+            self._evicted(key)
+            if self.evict_callback is not None:
+                self.evict_callback(key, value)
+            return
+        self._enforce_limits(size)
         self._cache[key] = value
+        self._sizes[key] = size
+        self._current_bytes += size
 
-    def delete(self, key):
-        self._cache.pop(key)
+    def _delete(self, key):
+        #api says this method is supposed to be idempotent
+        if key in self._cache:
+            del self._cache[key]
+            self._current_bytes -= self._sizes.pop(key)
 
 
-class LimitedFileBackend(BasicInterface, DBMBackend):
+class LimitedFileBackend(CacheBackendInterface):
 
     def __init__(self, argument_dict):
-        '''If argument_dict contains a value for max_keys this maximum amount of cache values kept in the
+        '''Disk cache backend based on an append-only log of `.npy` segments.
+
+        The values are stored as `.npy` segments in the log file `<filename>.log.<generation>`,
+        arrays and `NumpyVectorArrays` as raw data, all other values pickled (see `_pack_value`).
+        The on-disk index `<filename>.index` is a journal of pickled records describing each
+        insertion and deletion. Inserting a key only appends to both files and reading a value
+        memory maps the corresponding segment (copy-on-write), so no unpickling of the data
+        takes place. On startup, the journal is replayed. The log and the index are compacted,
+        i.e. rewritten containing only the live entries, as soon as the dead bytes exceed the
+        live bytes (and `min_compaction_kbytes`) or the journal contains more than twice as
+        many records as there are keys. Several processes can share the same cache files;
+        writes are serialized via a lock file, on which reads of the journal take a shared
+        lock. An incompletely written record left by a crashed process is cut off before
+        further records are appended.
+
+        If argument_dict contains a value for max_keys this maximum amount of cache values kept in the
         internal cache file, otherwise its set to sys.maxlen.
         If necessary values are deleted from the cache in FIFO order.
+
+        If `write_behind` is True, `set` and `delete` only enqueue the operation for a background
+        writer thread and return immediately. Values which have not been written yet are
+        served from memory by `get`. At most `write_queue_size` operations are pending at any
+        time, further calls to `set` block until the writer has caught up. Call `flush` to
+        wait for all pending writes. At interpreter exit, the pending writes are flushed and
+        the writer is stopped (see `stop_writer`).
+        Note that values are not copied, so they must not be modified after being stored.
         '''
-        argument_dict['filename'] = argument_dict.get('filename', os.path.join(gettempdir(), str(uuid.uuid4())))
-        DBMBackend.__init__(self, argument_dict)
         self.logger.debug('LimitedFileBackend args {}'.format(pformat(argument_dict)))
+        self.filename = argument_dict.get('filename', os.path.join(gettempdir(), str(uuid.uuid4())))
         self._max_keys = argument_dict.get('max_keys', sys.maxsize)
-        self._keylist_fn = self.filename + '.keys'
-        try:
-            self._keylist = pymor.core.load(self._keylist_fn)
-        except:
-            self._keylist = deque()
-        self._enforce_limits(None)
+        self._min_compaction_bytes = argument_dict.get('min_compaction_kbytes', 1024) * 1024
+        self._index_fn = self.filename + '.index'
+        self._lock_file = open(self.filename + '.lock', 'a')
+        # flock does not serialize threads sharing the lock file, hence the additional thread lock
+        self._thread_lock = threading.Lock()
+        with self._exclusive():
+            self._load_index()
+            self._open_journal().close()
+            self._enforce_limits(0)
+        self._write_behind = argument_dict.get('write_behind', False)
+        if self._write_behind:
+            self._pending = {}
+            self._pending_lock = threading.Lock()
+            self._queue = Queue.Queue(argument_dict.get('write_queue_size', 16))
+            self._writer = threading.Thread(target=self._write_pending, name='LimitedFileBackend writer')
+            self._writer.daemon = True
+            self._writer.start()
+            _write_behind_backends.add(self)
         self.print_limit()
 
-    def _dump_keylist(self):
-        pymor.core.dump(self._keylist, open(self._keylist_fn, 'wb'))
+    @contextmanager
+    def _exclusive(self):
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
 
-    def _new_key(self, key):
-        self._keylist.append(key)
-        self._dump_keylist()
+    @contextmanager
+    def _shared(self):
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
 
-    def get(self, key):
-        return super(LimitedFileBackend, self).get(key)
+    def _write_pending(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP_WRITER:
+                self._queue.task_done()
+                break
+            key, value = item
+            try:
+                if value is dc.api.NO_VALUE:
+                    self._delete_now(key)
+                else:
+                    self._set_now(key, value)
+            except Exception as e:
+                self.logger.error('Writing cache entry {} failed: {}'.format(key, e))
+            finally:
+                with self._pending_lock:
+                    if key in self._pending and self._pending[key] is value:
+                        del self._pending[key]
+                self._queue.task_done()
 
-    def print_limit(self, additional_size=0):
-        self.logger.info('LimitedFileBackend at {}({}) keys'
-                         .format(len(self._keylist), self._max_keys))
+    def flush(self):
+        '''Wait until all pending write-behind operations have been written to disk.'''
+        if self._write_behind:
+            self._queue.join()
 
-    def _enforce_limits(self, new_value):
-        while len(self._keylist) > 0 and not (len(self._keylist) <= self._max_keys):
-            self.logger.debug('shrinking limited memory cache')
-            key = self._keylist.popleft()
-            self.delete(key)
+    def stop_writer(self):
+        '''Write all pending operations and stop the writer thread.
 
-    def set(self, key, value):
-        self._enforce_limits(value)
-        if not key in self._keylist:
-            self._new_key(key)
-        super(LimitedFileBackend, self).set(key, value)
+        Afterwards, `set` and `delete` write synchronously. This is called for all
+        write-behind backends at interpreter exit.
+        '''
+        if self._write_behind:
+            self.flush()
+            self._queue.put(_STOP_WRITER)
+            self._writer.join()
+            self._write_behind = False
+            _write_behind_backends.discard(self)
 
-    def delete(self, key):
-        super(LimitedFileBackend, self).delete(key)
+    def _log_fn(self, generation):
+        return '{}.log.{}'.format(self.filename, generation)
+
+    def _load_index(self):
+        if not os.path.exists(self._index_fn):
+            self._write_index([('g', 0)])
+        self._state = (OrderedDict(), None)
+        self._live_bytes = self._dead_bytes = 0
+        self._journal_length = 0
+        self._index_pos = 0
+        self._read_journal()
+
+    def _read_journal(self):
+        with open(self._index_fn, 'rb') as f:
+            f.seek(self._index_pos)
+            while True:
+                try:
+                    record = pymor.core.load(f)
+                except Exception:
+                    # end of journal or incompletely written record
+                    break
+                self._index_pos = f.tell()
+                self._journal_length += 1
+                if record[0] == 's':
+                    key, entry = record[1], record[2:]
+                    if key in self._index:
+                        self._remove_entry(key)
+                    self._index[key] = entry
+                    self._live_bytes += entry[1] - entry[0]
+                elif record[0] == 'd':
+                    if record[1] in self._index:
+                        self._remove_entry(record[1])
+                else:
+                    # generation records only start a journal, so the index is still empty here
+                    self._state = (OrderedDict(), record[1])
+                    if not os.path.exists(self._log_fn(self._generation)):
+                        open(self._log_fn(self._generation), 'ab').close()
+
+    def _sync(self):
+        '''Catch up with the records appended to the journal by other processes.'''
         try:
+            with open(self._index_fn, 'rb') as f:
+                generation = pymor.core.load(f)[1]
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+        except (IOError, OSError, EOFError):
+            generation = None
+        if generation != self._generation:
+            self._load_index()
+        elif size > self._index_pos:
+            self._read_journal()
+
+    def _open_journal(self):
+        '''Open the journal for appending after its last complete record.
+
+        Anything behind this record has been left by a process which crashed while
+        writing. It is cut off, as records appended after it could not be read.
+        '''
+        f = open(self._index_fn, 'r+b')
+        f.seek(0, os.SEEK_END)
+        if f.tell() > self._index_pos:
+            self.logger.warn('discarding incomplete record at the end of {}'.format(self._index_fn))
+            f.truncate(self._index_pos)
+            f.seek(self._index_pos)
+        return f
+
+    def _write_index(self, records, append=False):
+        if append:
+            with self._open_journal() as f:
+                for record in records:
+                    pymor.core.dump(record, f)
+                self._index_pos = f.tell()
+            self._journal_length += len(records)
+        else:
+            tmp = '{}.{}.tmp'.format(self._index_fn, uuid.uuid4())
+            with open(tmp, 'wb') as f:
+                for record in records:
+                    pymor.core.dump(record, f)
+                self._index_pos = f.tell()
+            os.rename(tmp, self._index_fn)
+            self._journal_length = len(records)
+
+    def _remove_entry(self, key):
+        start, end = self._index.pop(key)[:2]
+        self._live_bytes -= end - start
+        self._dead_bytes += end - start
+
+    @property
+    def _index(self):
+        return self._state[0]
+
+    @property
+    def _generation(self):
+        return self._state[1]
+
+    def _map(self, entry, generation):
+        _, _, data_offset, dtype, shape, fortran, header = entry
+        order = 'F' if fortran else 'C'
+        if np.prod(shape) == 0:
+            array = np.empty(shape, dtype=dtype, order=order)
+        else:
+            array = np.memmap(self._log_fn(generation), dtype=dtype, mode='c', offset=data_offset,
+                              shape=shape, order=order)
+        return _unpack_value(header, array)
+
+    def _get(self, key):
+        if self._write_behind:
+            with self._pending_lock:
+                if key in self._pending:
+                    return self._pending[key]
+        # the index and the generation of the log it refers to are replaced by a single
+        # assignment of `_state`, so they can be read without locking
+        index, generation = self._state
+        entry = index.get(key)
+        if entry is not None:
+            try:
+                return self._map(entry, generation)
+            except (IOError, OSError, ValueError):
+                # the log has been compacted by another process
+                pass
+        with self._shared():
+            self._sync()
+            entry = self._index.get(key)
+            return dc.api.NO_VALUE if entry is None else self._map(entry, self._generation)
+
+    def contains(self, key):
+        '''Returns True if an entry for `key` is stored or about to be written.'''
+        if self._write_behind:
+            with self._pending_lock:
+                if key in self._pending:
+                    return self._pending[key] is not dc.api.NO_VALUE
+        return key in self._state[0]
+
+    def keys(self):
+        '''Returns the keys of all stored entries in the order in which they are evicted.'''
+        self.flush()
+        return list(self._state[0])
+
+    def entry_bytes(self, keys):
+        '''Returns the number of bytes of the stored entries for `keys` (compare `nbytes`).'''
+        index = self._state[0]
+        return sum(index[key][1] - index[key][0] for key in keys if key in index)
+
+    @property
+    def nbytes(self):
+        return self._live_bytes
+
+    def print_limit(self, additional_size=0):
+        self.logger.info('LimitedFileBackend at {}({}) keys -- {} live, {} dead Byte'
+                         .format(len(self._index), self._max_keys, self._live_bytes, self._dead_bytes))
+
+    def _enforce_limits(self, additional_keys):
+        while len(self._index) > 0 and len(self._index) + additional_keys > self._max_keys:
+            self.logger.debug('shrinking limited file cache')
+            key = next(iter(self._index))
+            self._remove_entry(key)
+            self._evicted(key)
+            self._write_index([('d', key)], append=True)
+
+    def _append(self, key, value):
+        header, array = _pack_value(value)
+        with open(self._log_fn(self._generation), 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            # align segments to 64 bytes
+            start = -(-size // 64) * 64
+            f.write(b'\0' * (start - size))
+            np.lib.format.write_array(f, array)
+            f.flush()
+            end = f.tell()
+        entry = (start, end, end - array.nbytes, array.dtype.str, array.shape,
+                 array.flags.f_contiguous and not array.flags.c_contiguous, header)
+        if key in self._index:
+            self._remove_entry(key)
+        self._index[key] = entry
+        self._live_bytes += end - start
+        return ('s', key) + entry
+
+    def _enqueue(self, key, value):
+        with self._pending_lock:
+            self._pending[key] = value
+        self._queue.put((key, value))
+
+    def _set(self, key, value):
+        if self._write_behind:
+            self._enqueue(key, value)
+        else:
+            self._set_now(key, value)
+
+    def _set_multi(self, mapping):
+        if self._write_behind:
+            for key, value in mapping.iteritems():
+                self._enqueue(key, value)
+            return
+        with self._exclusive():
+            self._sync()
+            records = []
+            for key, value in mapping.iteritems():
+                if key not in self._index:
+                    self._enforce_limits(1)
+                records.append(self._append(key, value))
+            self._write_index(records, append=True)
+            self._compact_if_needed()
+
+    def _set_now(self, key, value):
+        with self._exclusive():
+            self._sync()
+            if key not in self._index:
+                self._enforce_limits(1)
+            self._write_index([self._append(key, value)], append=True)
+            self._compact_if_needed()
+
+    def _delete(self, key):
+        if self._write_behind:
+            self._enqueue(key, dc.api.NO_VALUE)
+        else:
+            self._delete_now(key)
+
+    def _delete_now(self, key):
+        with self._exclusive():
+            self._sync()
             #api says this method is supposed to be idempotent
-            self._keylist.remove(key)
-        except ValueError:
-            pass
-        self._dump_keylist()
+            if key in self._index:
+                self._remove_entry(key)
+                self._write_index([('d', key)], append=True)
+                self._compact_if_needed()
+
+    def _compact_if_needed(self):
+        if ((self._dead_bytes > max(self._live_bytes, self._min_compaction_bytes))
+                or self._journal_length > 2 * len(self._index) + 100):
+            self._compact()
+
+    def compact(self):
+        '''Rewrite log and index such that they only contain the live entries.'''
+        self.flush()
+        with self._exclusive():
+            self._sync()
+            self._compact()
+
+    def _compact(self):
+        self.logger.debug('compacting limited file cache')
+        old_log_fn = self._log_fn(self._generation)
+        generation = self._generation + 1
+        records = [('g', generation)]
+        index = OrderedDict()
+        pos = 0
+        with open(old_log_fn, 'rb') as old_log, open(self._log_fn(generation), 'wb') as new_log:
+            for key, entry in self._index.iteritems():
+                start, end = entry[:2]
+                new_start = -(-pos // 64) * 64
+                new_log.write(b'\0' * (new_start - pos))
+                old_log.seek(start)
+                remaining = end - start
+                while remaining > 0:
+                    chunk = old_log.read(min(remaining, 2**24))
+                    new_log.write(chunk)
+                    remaining -= len(chunk)
+                pos = new_start + end - start
+                index[key] = (new_start, pos, new_start + entry[2] - start) + entry[3:]
+                records.append(('s', key) + index[key])
+        # renaming the new index is the atomic commit of the compaction
+        self._write_index(records)
+        self._state = (index, generation)
+        self._dead_bytes = 0
+        os.remove(old_log_fn)
+
+
+_write_behind_backends = WeakSet()
+_STOP_WRITER = object()
+
+
+@atexit.register
+def _stop_write_behind_backends():
+    for backend in list(_write_behind_backends):
+        backend.stop_writer()
+
+
+class TieredBackend(CacheBackendInterface):
+
+    def __init__(self, argument_dict):
+        '''Two-level cache backend with a `LimitedMemoryBackend` on top of a `LimitedFileBackend`.
+
+        New values are only stored in the memory tier. Values evicted from the memory tier
+        are demoted to the disk tier, values found in the disk tier are promoted to the memory
+        tier. A promoted value is kept on disk, so it does not have to be written again
+        when it is demoted unchanged.
+
+        argument_dict may contain the argument dicts `memory` and `disk` for the two tiers.
+
+        Hit, miss, promotion and demotion counts for both tiers are available via the
+        `tier_statistics` property. Promotions are counted for the memory tier, which
+        receives the promoted values, demotions for the disk tier. Hits, misses and bytes
+        are those of the `statistics` of the two tiers. `nbytes` counts entries which are
+        held by both tiers only once, with their size in memory.
+        '''
+        self.logger.debug('TieredBackend args {}'.format(pformat(argument_dict)))
+        self._memory = LimitedMemoryBackend(argument_dict.get('memory', {}))
+        self._memory.evict_callback = self._demote
+        self._disk = LimitedFileBackend(argument_dict.get('disk', {}))
+        self._tier_events = {tier: {'promotions': 0, 'demotions': 0} for tier in ('memory', 'disk')}
+
+    def _demote(self, key, value):
+        if not self._disk.contains(key):
+            self._disk.set(key, value)
+        self._tier_events['disk']['demotions'] += 1
+
+    def _get(self, key):
+        value = self._memory.get(key)
+        if value is not dc.api.NO_VALUE:
+            return value
+        value = self._disk.get(key)
+        if value is dc.api.NO_VALUE:
+            return value
+        self._memory.set(key, value)
+        self._tier_events['memory']['promotions'] += 1
+        return value
+
+    @property
+    def tier_statistics(self):
+        stats = {}
+        for tier, backend in (('memory', self._memory), ('disk', self._disk)):
+            stats[tier] = dict(self._tier_events[tier], hits=backend._hits, misses=backend._misses,
+                               bytes=backend.nbytes)
+        return stats
+
+    @property
+    def nbytes(self):
+        # promoted entries are kept on disk, but are only counted once
+        return self._memory.nbytes + self._disk.nbytes - self._disk.entry_bytes(self._memory.sizes())
+
+    def statistics(self):
+        stats = super(TieredBackend, self).statistics()
+        stats['evictions'] = self._disk.statistics()['evictions']
+        stats['tiers'] = self.tier_statistics
+        return stats
+
+    def print_limit(self, additional_size=0):
+        self._memory.print_limit(additional_size)
+        self._disk.print_limit()
+
+    def _set(self, key, value):
+        # a value kept on disk after its promotion is outdated now
+        if self._disk.contains(key):
+            self._disk.delete(key)
+        self._memory.set(key, value)
+
+    def _delete(self, key):
+        self._memory.delete(key)
+        self._disk.delete(key)
+
+
+def _pack_value(value):
+    '''Split a cache value into a numpy array holding its data and a small picklable header.
+
+    Arrays and the data of `NumpyVectorArrays` are stored as they are, so that they
+    can be memory mapped when read back by `_unpack_value`. All other values are
+    pickled into an array of bytes.
+    '''
+    from pymor.la.numpyvectorarray import NumpyVectorArray
+    metadata = None
+    if isinstance(value, dc.api.CachedValue):
+        value, metadata = value.payload, value.metadata
+    if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        kind, array = 'ndarray', value
+    elif isinstance(value, NumpyVectorArray):
+        kind, array = 'NumpyVectorArray', value._array[:value._len]
+    else:
+        kind, array = 'pickle', np.frombuffer(pymor.core.dumps(value), dtype=np.uint8)
+    return (kind, metadata), array
+
+
+def _unpack_value(header, array):
+    from pymor.la.numpyvectorarray import NumpyVectorArray
+    kind, metadata = header
+    if kind == 'ndarray':
+        value = array
+    elif kind == 'NumpyVectorArray':
+        value = NumpyVectorArray(array, copy=False)
+    else:
+        value = pymor.core.loads(array.tostring())
+    return value if metadata is None else dc.api.CachedValue(value, metadata)
+
+
+class SharedMemoryBackend(CacheBackendInterface):
+
+    def __init__(self, argument_dict):
+        '''Cache backend whose entries can be shared between several local processes.
+
+        Each entry is stored as a `.npy` segment in the directory given by the `path`
+        argument, which should reside on a memory backed file system like `/dev/shm`
+        (the default, if available). Next to each segment, a small index file holds
+        the key and the pickled header of the entry. Arrays are memory mapped
+        (copy-on-write) on `get`, so all processes reading an entry share the same
+        physical pages and no unpickling of the data takes place.
+
+        If argument_dict contains a value for max_kbytes this is the total memory limit in kByte for all
+        segments in `path`, otherwise it's set to sys.maxint.
+        If necessary, the least recently used entries are deleted from the cache.
+        The sizes of the segments are recorded in the file `.sizes` in `path`, which is only
+        modified while holding the lock file `.lock`, so the segments themselves only have
+        to be inspected when entries need to be evicted.
+        '''
+        self.logger.debug('SharedMemoryBackend args {}'.format(pformat(argument_dict)))
+        self.path = argument_dict.get('path', SHARED_MEMORY_CONFIG['arguments.path'])
+        self._max_bytes = argument_dict.get('max_kbytes', sys.maxint / 1024) * 1024
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError:
+                # another process might have created the directory in the meantime
+                if not os.path.isdir(self.path):
+                    raise
+        self._sizes_filename = os.path.join(self.path, '.sizes')
+        self._lock_file = open(os.path.join(self.path, '.lock'), 'a')
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _exclusive(self):
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _basename(self, key):
+        return os.path.join(self.path, hashlib.sha1(key).hexdigest())
+
+    def _write_tmp(self, write):
+        tmp = os.path.join(self.path, '.{}.tmp'.format(uuid.uuid4()))
+        with open(tmp, 'wb') as f:
+            write(f)
+        return tmp
+
+    def _load_sizes(self):
+        try:
+            with open(self._sizes_filename, 'rb') as f:
+                return pymor.core.load(f)
+        except (IOError, OSError, EOFError):
+            # no size index has been written for this directory yet
+            sizes = {}
+            for fn in os.listdir(self.path):
+                if fn.endswith('.npy'):
+                    try:
+                        sizes[fn[:-4]] = os.path.getsize(os.path.join(self.path, fn))
+                    except OSError:
+                        pass
+            return sizes
+
+    def _store_sizes(self, sizes):
+        os.rename(self._write_tmp(lambda f: pymor.core.dump(sizes, f)), self._sizes_filename)
+
+    def _get(self, key):
+        name = self._basename(key)
+        try:
+            with open(name + '.idx', 'rb') as f:
+                stored_key, header = pymor.core.load(f)
+            if stored_key != key:
+                return dc.api.NO_VALUE
+            try:
+                array = np.load(name + '.npy', mmap_mode='c')
+            except ValueError:
+                # empty arrays cannot be memory mapped
+                array = np.load(name + '.npy')
+            os.utime(name + '.npy', None)
+        except (IOError, OSError, EOFError):
+            return dc.api.NO_VALUE
+        return _unpack_value(header, array)
+
+    @property
+    def nbytes(self):
+        return sum(self._load_sizes().itervalues())
+
+    def print_limit(self, additional_size=0):
+        sizes = self._load_sizes()
+        self.logger.info('SharedMemoryBackend at {} keys -- {}({}) Byte'
+                         .format(len(sizes), sum(sizes.itervalues()) + additional_size, self._max_bytes))
+
+    def _last_use(self, name):
+        try:
+            return os.stat(os.path.join(self.path, name + '.npy')).st_mtime
+        except OSError:
+            return 0
+
+    def _enforce_limits(self, sizes, additional_size):
+        current_bytes = sum(sizes.itervalues())
+        if current_bytes + additional_size <= self._max_bytes:
+            return
+        for _, name in sorted((self._last_use(name), name) for name in sizes):
+            if current_bytes + additional_size <= self._max_bytes:
+                break
+            self.logger.debug('shrinking shared memory cache')
+            self._remove_files(os.path.join(self.path, name))
+            self._evicted(name)
+            current_bytes -= sizes.pop(name)
+
+    def _remove_files(self, name):
+        for fn in (name + '.idx', name + '.npy'):
+            try:
+                os.remove(fn)
+            except OSError:
+                pass
+
+    def _set(self, key, value):
+        header, array = _pack_value(value)
+        name = self._basename(key)
+        segment = os.path.basename(name)
+        npy_tmp = self._write_tmp(lambda f: np.save(f, array))
+        size = os.path.getsize(npy_tmp)
+        if size > self._max_bytes:
+            self.logger.debug('value of size {} Byte exceeds cache limit, not caching'.format(size))
+            os.remove(npy_tmp)
+            self._evicted(key)
+            # an older value must not be served instead
+            self._delete(key)
+            return
+        idx_tmp = self._write_tmp(lambda f: pymor.core.dump((key, header), f))
+        with self._exclusive():
+            sizes = self._load_sizes()
+            sizes.pop(segment, None)
+            self._enforce_limits(sizes, size)
+            os.rename(npy_tmp, name + '.npy')
+            os.rename(idx_tmp, name + '.idx')
+            sizes[segment] = size
+            self._store_sizes(sizes)
+
+    def _delete(self, key):
+        name = self._basename(key)
+        with self._exclusive():
+            self._remove_files(name)
+            sizes = self._load_sizes()
+            if sizes.pop(os.path.basename(name), None) is not None:
+                self._store_sizes(sizes)
+
 
 dc.register_backend("LimitedMemory", "pymor.core.cache", "LimitedMemoryBackend")
 dc.register_backend("LimitedFile", "pymor.core.cache", "LimitedFileBackend")
+dc.register_backend("Tiered", "pymor.core.cache", "TieredBackend")
+dc.register_backend("SharedMemory", "pymor.core.cache", "SharedMemoryBackend")
 dc.register_backend("Dummy", "pymor.core.cache", "DummyBackend")
 
 
+_hash_factory = getattr(hashlib, 'blake2b', hashlib.sha1)
+
+
+_FINGERPRINT_IGNORED_ATTRIBUTES = {'cache_region', 'namespace', 'expiration_time', '_cache_config',
+                                   '_cache_statistics', 'logger', 'visualize',
+                                   '_last_mu', '_last_mat', '_locked', '_frozen', '_fingerprint_cache'}
+
+
+def _fingerprint_tag(value):
+    '''The `fingerprint_tag` of a class or the one set on a function or object itself. A tag defined
+    by the class of an object only applies to the class, not to its instances.'''
+    if isinstance(value, (type, types.ClassType)):
+        return getattr(value, 'fingerprint_tag', None)
+    return getattr(value, '__dict__', {}).get('fingerprint_tag')
+
+
+def _update_hash(h, value, quantization, seen=None):
+    if value is None:
+        h.update(b'N')
+    elif isinstance(value, np.ndarray):
+        if quantization is not None and value.dtype.kind in 'fc':
+            value = np.round(value / quantization).astype(np.int64 if value.dtype.kind == 'f' else np.complex128)
+        h.update('A{}{}'.format(value.dtype.str, value.shape).encode('ascii'))
+        h.update(np.ascontiguousarray(value))
+    elif isinstance(value, dict):
+        h.update('D{}'.format(len(value)).encode('ascii'))
+        for k in sorted(value.keys()):
+            _update_hash(h, k, quantization, seen)
+            _update_hash(h, value[k], quantization, seen)
+    elif isinstance(value, (tuple, list)):
+        h.update('T{}'.format(len(value)).encode('ascii'))
+        for v in value:
+            _update_hash(h, v, quantization, seen)
+    elif isinstance(value, (set, frozenset)):
+        _update_hash(h, sorted(value), quantization, seen)
+    elif isinstance(value, float) and quantization is not None:
+        h.update('I{}'.format(int(round(value / quantization))).encode('ascii'))
+    elif isinstance(value, (Number, basestring)):
+        h.update('{}{!r}'.format(type(value).__name__, value).encode('utf-8'))
+    elif seen is None:
+        h.update('S{}'.format(value).encode('utf-8'))
+    elif _fingerprint_tag(value) is not None:
+        h.update('V{}.{}'.format(getattr(value, '__module__', ''), getattr(value, '__name__', type(value).__name__))
+                 .encode('utf-8'))
+        _update_hash(h, _fingerprint_tag(value), quantization, seen)
+    elif isinstance(value, (type, types.BuiltinFunctionType)):
+        h.update('C{}.{}'.format(value.__module__, value.__name__).encode('utf-8'))
+    elif isinstance(value, types.MethodType):
+        h.update(b'M')
+        _update_hash(h, (value.im_func, value.im_self), quantization, seen)
+    elif isinstance(value, types.FunctionType):
+        h.update('F{}.{}'.format(value.__module__, value.__name__).encode('utf-8'))
+        _update_hash(h, (value.func_code, value.func_defaults,
+                         tuple(c.cell_contents for c in value.func_closure or ())), quantization, seen)
+    elif isinstance(value, types.CodeType):
+        h.update(b'K')
+        h.update(value.co_code)
+        _update_hash(h, (value.co_consts, value.co_names), quantization, seen)
+    elif id(value) in seen:
+        h.update('R{}'.format(seen[id(value)]).encode('ascii'))
+    elif hasattr(value, '__dict__'):
+        seen[id(value)] = len(seen)
+        h.update('O{}.{}'.format(type(value).__module__, type(value).__name__).encode('utf-8'))
+        _update_hash(h, {k: v for k, v in value.__dict__.iteritems() if k not in _FINGERPRINT_IGNORED_ATTRIBUTES},
+                     quantization, seen)
+    else:
+        h.update('S{}'.format(value).encode('utf-8'))
+
+
+def fingerprint(obj):
+    '''Compute a digest of an object which is stable across processes and runs.
+
+    In contrast to `hash_args`, objects of unknown type are hashed by their class name and
+    (recursively) their attributes, excluding caching related ones. Python functions are hashed
+    via their name, byte code, constants, default arguments and closure. Classes, functions
+    and objects can provide an explicit version tag via a `fingerprint_tag` attribute, which
+    is then hashed instead of their contents. For objects, the tag has to be set on the
+    object itself; a tag defined by its class only tags the class.
+
+    The fingerprint can be used to make cache entries reusable for identical, but different
+    objects (compare `StationaryLinearDiscretization`).
+
+    Parameters
+    ----------
+    obj
+        The object to fingerprint.
+
+    Returns
+    -------
+    The hex digest as a string.
+    '''
+    h = _hash_factory()
+    _update_hash(h, obj, None, {})
+    return h.hexdigest()
+
+
+def hash_args(args, kwargs={}, quantization=None):
+    '''Compute a fixed-length digest of the given positional and keyword arguments.
+
+    Numpy arrays (also when contained in a `Parameter` or other dict, tuple or list)
+    are hashed via their dtype, shape and raw data buffer, so different arrays never
+    share a key due to truncated or rounded string representations. Objects of
+    unknown type are hashed via their string representation.
+
+    Parameters
+    ----------
+    args
+        Sequence of positional arguments.
+    kwargs
+        Dict of keyword arguments.
+    quantization
+        If not None, floating point values are rounded to multiples of `quantization`
+        before hashing. If None, `defaults.cache_key_quantization` is used.
+
+    Returns
+    -------
+    The hex digest as a string.
+    '''
+    quantization = quantization or defaults.cache_key_quantization
+    h = _hash_factory()
+    _update_hash(h, tuple(args), quantization)
+    _update_hash(h, kwargs, quantization)
+    return h.hexdigest()
+
+
+_cachables = WeakSet()
+
+
+def cache_report():
+    '''Returns a summary of the usage statistics of all live `Cachable` objects.
+
+    See `Cachable.cache_statistics`.
+    '''
+    lines = []
+    unused = 0
+    for c in list(_cachables):
+        stats = c.cache_statistics()
+        if not stats['methods']:
+            unused += 1
+            continue
+        backend = stats['backend']
+        lines.append('{} ({}): {} hits, {} misses, {} sets, {} evictions, {} Byte, {:.3f}s saved'
+                     .format(c.namespace, c.cache_region.backend.__class__.__name__, backend.get('hits'),
+                             backend.get('misses'), backend.get('sets'), backend.get('evictions'),
+                             backend.get('bytes'), stats['time_saved']))
+        for fname, m in sorted(stats['methods'].iteritems()):
+            lines.append('    {}: {} hits, {} misses, {:.3f}s creating, {:.3f}s saved'
+                         .format(fname, m['hits'], m['misses'], m['creation_time'], m['time_saved']))
+    lines.append('{} cache regions without accesses'.format(unused))
+    return '\n'.join(lines)
+
+
 class cached(BasicInterface):
 
     def __init__(self, function):
@@ -162,11 +1125,69 @@ class cached(BasicInterface):
         keygen = im_self.keygen_generator(im_self.namespace, self.decorated_function)
         key = keygen(*args, **kwargs)
 
+        creation_time = []
+
         def creator_function():
             self.logger.debug('creating new cache entry for {}.{}'
                               .format(im_self.__class__.__name__, self.decorated_function.__name__))
-            return self.decorated_function(im_self, *args, **kwargs)
-        return cache.get_or_create(key, creator_function, im_self.expiration_time)
+            tic = time.time()
+            value = self.decorated_function(im_self, *args, **kwargs)
+            creation_time.append(time.time() - tic)
+            cache.report_creation_time(creation_time[0])
+            return value
+        value = cache.get_or_create(key, creator_function, im_self.expiration_time)
+        im_self._record_cache_access(self.decorated_function.__name__, key,
+                                     creation_time[0] if creation_time else None)
+        return value
+
+    def get_or_create_many(self, im_self, args_list, creator):
+        '''Look up the values of the decorated method for several argument tuples at once.
+
+        The cache is queried for all keys in a single batch and `creator` is called only
+        once with the list of argument tuples for which no cache entry exists. It has to
+        return the corresponding values in the same order. The new values are then stored
+        with a single bulk write.
+
+        Parameters
+        ----------
+        im_self
+            The instance of the class whose method is decorated.
+        args_list
+            List of tuples of positional arguments for the decorated method.
+        creator
+            Function computing the values for a list of argument tuples.
+
+        Returns
+        -------
+        List of the values for all entries of `args_list`.
+        '''
+        args_list = list(args_list)
+        if self._cache_disabled:
+            return list(creator(args_list))
+        keygen = im_self.keygen_generator(im_self.namespace, self.decorated_function)
+        fname = self.decorated_function.__name__
+        keys = [keygen(*args) for args in args_list]
+        args_by_key = dict(zip(keys, args_list))
+        created = set()
+
+        def creator_function(*keys_to_create):
+            self.logger.debug('creating {} new cache entries for {}.{}'
+                              .format(len(keys_to_create), im_self.__class__.__name__, fname))
+            tic = time.time()
+            values = list(creator([args_by_key[key] for key in keys_to_create]))
+            creation_time = (time.time() - tic) / max(len(keys_to_create), 1)
+            im_self.cache_region.report_creation_time(creation_time)
+            for key in keys_to_create:
+                im_self._record_cache_access(fname, key, creation_time)
+                created.add(key)
+            return values
+        values = im_self.cache_region.get_or_create_multi(keys, creator_function, im_self.expiration_time)
+        for key in keys:
+            if key in created:
+                created.remove(key)
+            else:
+                im_self._record_cache_access(fname, key, None)
+        return values
 
     def __get__(self, instance, instancetype):
         '''Implement the descriptor protocol to make decorating instance method possible.
@@ -177,6 +1198,27 @@ class cached(BasicInterface):
         return partial(self.__call__, instance)
 
 
+class _CachableRegion(dc.region.CacheRegion):
+    '''`CacheRegion` which stores the time needed to create a value in the value's metadata.
+
+    Creator functions report this time via `report_creation_time` before returning. It is
+    stored as `creation_time` in the metadata, so it is persisted together with the value
+    by the disk backends.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(_CachableRegion, self).__init__(*args, **kwargs)
+        self._creation = threading.local()
+
+    def report_creation_time(self, creation_time):
+        self._creation.time = creation_time
+
+    def _value(self, value):
+        value = super(_CachableRegion, self)._value(value)
+        value.metadata['creation_time'] = getattr(self._creation, 'time', 0.)
+        return value
+
+
 class Cachable(object):
     '''Base class for anything that wants to use our built-in caching.
     provides custom __{g,s}etstate__ functions to allow using derived
@@ -186,24 +1228,64 @@ class Cachable(object):
     def __init__(self, config=DEFAULT_MEMORY_CONFIG):
         self._cache_config = config
         self._init_cache()
-        self.namespace = '{}_{}'.format(self.__class__.__name__, hash(self))
+        # subclasses can compute the namespace on demand, e.g. from a fingerprint of their contents
+        if not isinstance(getattr(type(self), 'namespace', None), property):
+            self.namespace = '{}_{}'.format(self.__class__.__name__, hash(self))
         self.expiration_time = None
 
     def _init_cache(self):
-        self.cache_region = dc.make_region(function_key_generator=self.keygen_generator)
+        self.cache_region = _CachableRegion(function_key_generator=self.keygen_generator)
         self.cache_region.configure_from_config(self._cache_config, '')
+        self._cache_statistics = {}
+        _cachables.add(self)
+
+    def _record_cache_access(self, fname, key, creation_time):
+        stats = self._cache_statistics.get(fname)
+        if stats is None:
+            stats = self._cache_statistics[fname] = {'hits': 0, 'misses': 0, 'creation_time': 0., 'time_saved': 0.}
+        if creation_time is None:
+            stats['hits'] += 1
+            recent_hits = getattr(self.cache_region.backend, 'recent_hits', dict)()
+            stats['time_saved'] += (recent_hits.get(key) or {}).get('creation_time', 0.)
+        else:
+            stats['misses'] += 1
+            stats['creation_time'] += creation_time
+
+    def cache_statistics(self):
+        '''Returns usage statistics of the cache region.
+
+        Returns
+        -------
+        Dict with the following fields:
+            'backend'
+                The `statistics()` of the backend (hits, misses, sets, evictions
+                and bytes held).
+            'methods'
+                Dict of the hit and miss counts, the time spent creating the
+                cache entries and the time saved by cache hits for each
+                `cached` method, keyed by method name.
+            'time_saved'
+                The total time saved by cache hits. For each hit, the time which
+                was needed to create the corresponding cache entry is counted. This
+                time is stored in the metadata of the entry, so it is also known for
+                entries created in earlier runs.
+        '''
+        backend = self.cache_region.backend
+        methods = {fname: stats.copy() for fname, stats in self._cache_statistics.iteritems()}
+        return {'backend': backend.statistics() if isinstance(backend, CacheBackendInterface) else {},
+                'methods': methods,
+                'time_saved': sum(stats['time_saved'] for stats in methods.itervalues())}
 
     def keygen_generator(self, namespace, function):
         '''I am the default generator function for (potentially) function specific keygens.
         I construct a key from the function name and given namespace
-        plus string representations of all positional and keyword args.
+        plus a digest of all positional and keyword args (see `hash_args`).
         '''
         fname = function.__name__
-        namespace = str(namespace)
+        prefix = '{}_{}:'.format(namespace, fname)
 
         def keygen(*arg, **kwargs):
-            return (namespace + "_" + fname + "_".join(str(s) for s in arg)
-                    + '__'.join(str(x) for x in kwargs.iteritems()))
+            return prefix + hash_args(arg, kwargs)
         return keygen
 
     def __getstate__(self):
@@ -19,13 +19,27 @@ class Defaults(BasicInterface):
     gram_schmidt_check:             check orthogonality of result
     gram_schmidt_check_tol:         tolerance for orthogonality check
 
+    pod_rtol:                       POD modes with singular values below this value times the largest singular
+                                    value are discarded by pymor.algorithms.pod
+
     bicgstab_tol:                   tolerance for scipy.sparse.linalg.bicg
     bicgstab_maxiter:               maximal number of iterations
 
     induced_norm_raise_negative:    raise error in la.induced_norm if the squared norm is negative
     induced_norm_tol:               tolerance for clipping negative norm squares to zero
 
+    vectorarray_product_dtype:      scalar products, gramians and norms of VectorArrays are computed
+                                    with at least this precision; if None, the precision of the
+                                    vectors is used
+
     random_seed:                    seed for numpy's random generator; if None, use /dev/urandom as source for seed
+
+    cache_key_quantization:         if not None, floating point values are rounded to multiples of this value
+                                    before computing cache keys
+    grid_cache_kbytes:              memory budget in kByte for the cached geometric data of each grid
+
+    greedy_solve_batch_size:        number of detailed solutions computed at once by pymor.algorithms.greedy
+                                    when no error estimator is used
     '''
 
     float_cmp_tol               = 2**4 * np.finfo(np.zeros(1).dtype).eps
@@ -36,14 +50,23 @@ class Defaults(BasicInterface):
     gram_schmidt_check          = True
     gram_schmidt_check_tol      = 1e-3
 
+    pod_rtol                    = 4e-8
+
     bicgstab_tol                = 1e-10
     bicgstab_maxiter            = None
 
     induced_norm_raise_negative = True
     induced_norm_tol            = 10e-10
 
+    vectorarray_product_dtype   = np.float64
+
     _random_seed                = 123456
 
+    cache_key_quantization      = None
+    grid_cache_kbytes           = 20000
+
+    greedy_solve_batch_size     = 20
+
     @property
     def random_seed(self):
         return self._random_seed
@@ -64,13 +87,22 @@ class Defaults(BasicInterface):
             gram_schmidt_check            = {0.gram_schmidt_check}
             gram_schmidt_check_tol        = {0.gram_schmidt_check_tol}
 
+            pod_rtol                      = {0.pod_rtol}
+
             bicgstab_tol                  = {0.bicgstab_tol}
             bicgstab_maxiter              = {0.bicgstab_maxiter}
 
             induced_norm_raise_negative   = {0.induced_norm_raise_negative}
             induced_norm_tol              = {0.induced_norm_tol}
 
+            vectorarray_product_dtype     = {0.vectorarray_product_dtype}
+
             random_seed                   = {0.random_seed}
+
+            cache_key_quantization        = {0.cache_key_quantization}
+            grid_cache_kbytes             = {0.grid_cache_kbytes}
+
+            greedy_solve_batch_size       = {0.greedy_solve_batch_size}
             '''.format(self)
 
 
@@ -8,7 +8,8 @@ import copy
 
 from pymor.core import BasicInterface
 from pymor.core.interfaces import abstractmethod
-from pymor.core.cache import Cachable, cached, DEFAULT_DISK_CONFIG
+from pymor.core.cache import Cachable, cached, fingerprint, DEFAULT_DISK_CONFIG
+from pymor.la import NumpyVectorArray
 from pymor.tools import Named
 from pymor.parameters import Parametric
 
@@ -40,6 +41,16 @@ class DiscretizationInterface(BasicInterface, Parametric, Cachable, Named):
         Cachable.__init__(c)
         return c
 
+    def fingerprint(self):
+        '''Return a digest of the discretization's contents which is stable across runs.
+
+        Two discretizations with equal fingerprint are expected to produce the same
+        solutions, so the fingerprint can be used as cache namespace to reuse cached
+        solutions across processes and program runs. By default, the operators of the
+        discretization are fingerprinted.
+        '''
+        return fingerprint((self.__class__, self.operators))
+
     @abstractmethod
     def _solve(self, mu=None):
         '''Perform the actual solving.'''
@@ -52,3 +63,38 @@ class DiscretizationInterface(BasicInterface, Parametric, Cachable, Named):
         The result is cached by default.
         '''
         return self._solve(mu)
+
+    def _solve_many(self, mus):
+        '''Perform the actual solving for a list of parameters.
+
+        Override this method to solve for several parameters at once more efficiently.
+        '''
+        return [self._solve(mu) for mu in mus]
+
+    def solve_many(self, mus):
+        '''Solve for a sequence of parameters `mus`.
+
+        The cache is queried for all parameters at once, `_solve_many` is only called
+        for the parameters without cached solution, and the new solutions are cached
+        with a single bulk write. The results are shared with `solve`. If a subclass
+        redefines `solve`, it is called for each parameter instead.
+
+        Returns
+        -------
+        `VectorArray` containing the solutions for all parameters in `mus`.
+        '''
+        mus = list(mus)
+        solve = next(c.__dict__['solve'] for c in type(self).__mro__ if 'solve' in c.__dict__)
+        if solve is DiscretizationInterface.__dict__['solve']:
+            solutions = solve.get_or_create_many(self, [(mu,) for mu in mus],
+                                                 lambda args_list: self._solve_many([args[0] for args in args_list]))
+        else:
+            # a redefined solve need not agree with _solve_many, so its results must not be created by it
+            solutions = [self.solve(mu) for mu in mus]
+        if not solutions:
+            return NumpyVectorArray.empty(self.solution_dim)
+        U = type(solutions[0]).empty(solutions[0].dim, reserve=sum(len(V) for V in solutions),
+                                     dtype=solutions[0].dtype)
+        for V in solutions:
+            U.append(V)
+        return U
@@ -5,11 +5,14 @@
 
 from __future__ import absolute_import, division, print_function
 
+from itertools import izip
+
 import numpy as np
 from scipy.sparse.linalg import bicgstab
 from scipy.sparse import issparse
 
 from pymor.core import defaults
+from pymor.core.cache import fingerprint
 from pymor.la import NumpyVectorArray
 from pymor.tools import dict_property
 from pymor.operators import LinearOperatorInterface, NumpyLinearOperator
@@ -56,6 +59,12 @@ class StationaryLinearDiscretization(DiscretizationInterface):
         For this class, operators has the keys 'operator' and 'rhs'.
     rhs
         The functional f_h. A synonym for operators['rhs'].
+
+    The cache namespace of the discretization is derived from its `fingerprint`,
+    so identically constructed discretizations share cached solutions, also
+    across program runs when a disk cache is used. The fingerprint covers the
+    operators, the solver and the parameter type and maps, and is recomputed
+    when one of them is replaced, e.g. by `rename_parameter`.
     '''
 
     disable_logging = False
@@ -94,6 +103,25 @@ class StationaryLinearDiscretization(DiscretizationInterface):
         self.solution_dim = operator.dim_range
         self.name = name
 
+    def _fingerprint_sources(self):
+        operators = sum(([k, self.operators[k]] for k in sorted(self.operators)), [])
+        return tuple([self.__class__] + operators +
+                     [self.solver, defaults.bicgstab_tol, defaults.bicgstab_maxiter, self.parameter_type,
+                      self.parameter_maps, self.parameter_maps_renamed, self.parameter_name_map])
+
+    def fingerprint(self):
+        return fingerprint(self._fingerprint_sources())
+
+    @property
+    def namespace(self):
+        # the fingerprint is only recomputed when one of its sources has been replaced
+        sources = self._fingerprint_sources()
+        cached = self.__dict__.get('_fingerprint_cache')
+        if cached is None or len(cached[0]) != len(sources) or any(a is not b for a, b in izip(cached[0], sources)):
+            cached = self._fingerprint_cache = (sources, '{}_{}'.format(self.__class__.__name__,
+                                                                        fingerprint(sources)))
+        return cached[1]
+
     def _solve(self, mu=None):
         mu = self.parse_parameter(mu)
         A = self.operator.assemble(self.map_parameter(mu, 'operator'))
@@ -105,3 +133,13 @@ class StationaryLinearDiscretization(DiscretizationInterface):
         RHS = self.rhs.assemble(self.map_parameter(mu, 'rhs'))
 
         return self.solver(A, RHS)
+
+    def _solve_many(self, mus):
+        if self.operator.parametric:
+            return super(StationaryLinearDiscretization, self)._solve_many(mus)
+        # the system matrix does not depend on mu, so it only has to be assembled once
+        mus = [self.parse_parameter(mu) for mu in mus]
+        A = self.operator.assemble()
+        if not self.disable_logging:
+            self.logger.info('Solving {} for {} parameters ...'.format(self.name, len(mus)))
+        return [self.solver(A, self.rhs.assemble(self.map_parameter(mu, 'rhs'))) for mu in mus]
@@ -4,8 +4,11 @@
 
 from __future__ import absolute_import, division, print_function
 
+from contextlib import contextmanager
+
 import numpy as np
 
+from pymor.core import defaults
 from pymor.core.cache import Cachable, cached
 from pymor.core.exceptions import CodimError
 from pymor.la.inverse import inv_transposed_two_by_two
@@ -13,6 +16,68 @@ from pymor.tools.relations import inverse_relation
 
 
 class ConformalTopologicalGridDefaultImplementations(Cachable):
+    '''Provides default implementations for the topological and geometric data of a grid.
+
+    All computed data is stored in a per-grid `LimitedMemoryBackend` with a budget of
+    `defaults.grid_cache_kbytes`. Data needed by an ongoing computation can be protected
+    from eviction using `pinned_cached_data`, all other data can be dropped with
+    `release_cached_data`. `resident_cached_data` reports which quantities are currently
+    held in memory.
+    '''
+
+    def __init__(self):
+        Cachable.__init__(self, config={'backend': 'LimitedMemory',
+                                        'arguments.max_kbytes': defaults.grid_cache_kbytes})
+        self._pinned_keys = None
+
+    def keygen_generator(self, namespace, function):
+        '''Generate human readable keys, e.g. `TriaGrid_123:_centers(0,)`, which are used
+        for reporting by `resident_cached_data`. The arguments are only numbers, strings
+        and None, so no digest is needed.
+        '''
+        prefix = '{}:{}'.format(namespace, function.__name__)
+
+        def keygen(*args, **kwargs):
+            return prefix + repr(args + tuple(sorted(kwargs.items())))
+        return keygen
+
+    def _record_cache_access(self, fname, key, creation_time):
+        super(ConformalTopologicalGridDefaultImplementations, self)._record_cache_access(fname, key, creation_time)
+        if self._pinned_keys is not None and key not in self._pinned_keys:
+            self.cache_region.backend.pin(key)
+            self._pinned_keys.add(key)
+
+    @contextmanager
+    def pinned_cached_data(self):
+        '''Context manager which protects all cached data accessed inside the context from
+        eviction until the context is left. This is used by the assembly of operators to
+        avoid recomputing data which is needed more than once. Nested contexts pin their
+        data until the outermost context is left.
+        '''
+        if self._pinned_keys is not None:
+            yield
+            return
+        self._pinned_keys = set()
+        try:
+            yield
+        finally:
+            pinned_keys, self._pinned_keys = self._pinned_keys, None
+            for key in pinned_keys:
+                self.cache_region.backend.unpin(key)
+
+    def release_cached_data(self):
+        '''Drop all cached data of the grid which is not pinned.'''
+        self.cache_region.backend.clear()
+
+    def resident_cached_data(self):
+        '''Returns a dict of all cached quantities with their size in Byte and whether they are pinned.
+
+        The keys are of the form `'_quadrature_points(0, 2, None, 'default')'`, the values are tuples
+        `(nbytes, pinned)`.
+        '''
+        backend = self.cache_region.backend
+        prefix_len = len(self.namespace) + 1
+        return {key[prefix_len:]: (size, backend.is_pinned(key)) for key, size in backend.sizes().iteritems()}
 
     @cached
     def _subentities(self, codim, subentity_codim=None):
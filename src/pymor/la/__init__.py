@@ -4,5 +4,9 @@
 
 from pymor.la.interfaces import VectorArray, Communicable
 from pymor.la.numpyvectorarray import NumpyVectorArray
-from pymor.la.basic import induced_norm
-from pymor.la.gram_schmidt import gram_schmidt, numpy_gram_schmidt
+from pymor.la.memmapvectorarray import MemmapVectorArray
+from pymor.la.sparsevectorarray import SparseVectorArray
+from pymor.la.blockvectorarray import BlockVectorArray
+from pymor.la.distributedvectorarray import DistributedVectorArray, LocalWorkerPool
+from pymor.la.basic import induced_norm, duplicate_indices
+from pymor.la.gram_schmidt import gram_schmidt, block_gram_schmidt, numpy_gram_schmidt, orthonormalize_against
@@ -5,6 +5,9 @@
 from __future__ import absolute_import, division, print_function
 
 import math as m
+from collections import defaultdict
+
+import numpy as np
 
 from pymor.core import defaults
 
@@ -43,3 +46,77 @@ def induced_norm(product):
         return m.sqrt(norm_squared)
 
     return norm
+
+
+def duplicate_indices(U, offset=0, rtol=None, atol=None, num_projections=3):
+    '''Find the indices of vectors which are almost equal to a previous vector.
+
+    The vectors are processed in order. A vector with index `j >= offset` is
+    considered a duplicate if `U.almost_equal(U, ind=[i], o_ind=[j])` holds for some
+    `i < j` which is not a duplicate itself. This agrees with comparing each vector
+    with all previous ones, but only needs O(len(U)) comparisons if the vectors are
+    well separated:
+
+    The vectors are put into buckets according to their scalar product with a
+    random linear combination of the vectors. Only vectors in the same or
+    neighbouring buckets, whose norms and scalar products with `num_projections`
+    further random combinations lie within the bounds implied by `almost_equal`,
+    are compared exactly. The bucket width and the bounds account for rounding errors
+    in the projections, so no pair of almost equal vectors can be missed.
+
+    Parameters
+    ----------
+    U
+        The `VectorArray` to search for duplicates.
+    offset
+        The first `offset` vectors are never considered duplicates.
+    rtol
+        See `pymor.tools.float_cmp`.
+    atol
+        See `pymor.tools.float_cmp`.
+    num_projections
+        Number of random projections used to filter candidate pairs.
+
+    Returns
+    -------
+    A sorted list of the indices of the duplicate vectors.
+    '''
+    n = len(U)
+    if n <= max(offset, 1):
+        return []
+    rtol = rtol or defaults.float_cmp_tol
+    atol = atol or rtol
+
+    # for almost equal x, y we have |x_i - y_i| <= atol + rtol * |y_i|, which implies
+    #   |(r, x) - (r, y)| <= atol * |r|_1 + rtol * |r|_sup * |y|_1   and
+    #   | |x|_2 - |y|_2 | <= atol * sqrt(dim) + rtol * |y|_2
+    # the computed keys and norms of x and y have rounding errors of at most eps * dim * |r|_2 * |x|_2
+    # and eps * dim * |x|_2, which are added to the bounds, using |x|_2 <= |y|_2 + norm bound
+    R = U.lincomb(np.random.RandomState(0).randn(num_projections + 1, n))
+    keys = U.prod(R, pairwise=False).real
+    l1_norms, l2_norms = U.lp_norm(1), U.l2_norm()
+    rounding = 2 * np.finfo(keys.dtype).eps * U.dim
+    norm_bounds = atol * np.sqrt(U.dim) + rtol * l2_norms
+    norm_bounds += rounding * (2 * l2_norms + norm_bounds)
+    key_bounds = ((atol * R.lp_norm(1))[np.newaxis, :] + rtol * np.outer(l1_norms, R.sup_norm())
+                  + rounding * np.outer(l2_norms + norm_bounds, R.l2_norm()))
+
+    width = np.max(key_bounds[:, 0])
+    buckets = np.floor(keys[:, 0] / width).astype(np.int64) if width > 0 else np.zeros(n, dtype=np.int64)
+    references = defaultdict(list)
+    for i in xrange(offset):
+        references[buckets[i]].append(i)
+
+    duplicates = []
+    for j in xrange(offset, n):
+        b = buckets[j]
+        candidates = np.array(references[b - 1] + references[b] + references[b + 1], dtype=np.intp)
+        if len(candidates) > 0:
+            close = np.all(np.abs(keys[candidates] - keys[j]) <= key_bounds[j], axis=1)
+            close &= np.abs(l2_norms[candidates] - l2_norms[j]) <= norm_bounds[j]
+            candidates = np.sort(candidates[close])
+        if any(U.almost_equal(U, ind=[i], o_ind=[j], rtol=rtol, atol=atol)[0] for i in candidates):
+            duplicates.append(j)
+        else:
+            references[b].append(j)
+    return duplicates
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pyMor project (http://www.pymor.org).
+# Copyright Holders: Felix Albrecht, Rene Milk, Stephan Rave
+# License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from pymor.la.interfaces import VectorArray, Communicable
+from pymor.la.numpyvectorarray import NumpyVectorArray
+
+
+class BlockVectorArray(VectorArray, Communicable):
+    '''`VectorArray` of vectors in a product space, stored as one `VectorArray` per block.
+
+    The `i`-th vector of the array is the concatenation of the `i`-th vectors of all
+    `blocks`. All operations are applied blockwise, scalar products and norms are
+    accumulated over the blocks. The vectors are never concatenated, except for
+    `data`. The blocks are accessed without copying via `blocks` or `block`.
+
+    Parameters
+    ----------
+    blocks
+        A sequence of `VectorArrays` of equal length. Block arrays combined with
+        each other need to have the same number of blocks and equal block dimensions.
+    copy
+        If True, the blocks are copied, otherwise they are used directly.
+    '''
+
+    @classmethod
+    def empty(cls, dim, reserve=0, dtype=None, block_type=NumpyVectorArray):
+        '''Create an empty `BlockVectorArray`, where `dim` is the sequence of block dimensions.'''
+        return cls([block_type.empty(d, reserve=reserve, dtype=dtype) for d in dim])
+
+    def __init__(self, blocks, copy=False):
+        blocks = tuple(b.copy() if copy else b for b in blocks)
+        assert len(blocks) > 0
+        assert all(len(b) == len(blocks[0]) for b in blocks)
+        self._blocks = blocks
+
+    @property
+    def blocks(self):
+        '''Tuple of the `VectorArrays` holding the blocks of the vectors.'''
+        return self._blocks
+
+    def block(self, i):
+        '''The `VectorArray` holding the `i`-th block of the vectors.'''
+        return self._blocks[i]
+
+    @property
+    def block_dims(self):
+        return tuple(b.dim for b in self._blocks)
+
+    def _data(self):
+        return np.hstack([b.data for b in self._blocks])
+
+    def _other_blocks(self, other):
+        if other is None:
+            return (None,) * len(self._blocks)
+        assert isinstance(other, BlockVectorArray)
+        assert other.block_dims == self.block_dims
+        return other._blocks
+
+    def __len__(self):
+        return len(self._blocks[0])
+
+    @property
+    def dim(self):
+        return sum(b.dim for b in self._blocks)
+
+    @property
+    def dtype(self):
+        return np.result_type(*[b.dtype for b in self._blocks])
+
+    def copy(self, ind=None, deep=True):
+        return BlockVectorArray([b.copy(ind, deep=deep) for b in self._blocks])
+
+    def append(self, other, o_ind=None, remove_from_other=False):
+        for b, o in zip(self._blocks, self._other_blocks(other)):
+            b.append(o, o_ind=o_ind, remove_from_other=remove_from_other)
+
+    def reserve(self, capacity):
+        for b in self._blocks:
+            b.reserve(capacity)
+
+    def shrink_to_fit(self):
+        for b in self._blocks:
+            b.shrink_to_fit()
+
+    def remove(self, ind):
+        for b in self._blocks:
+            b.remove(ind)
+
+    def replace(self, other, ind=None, o_ind=None, remove_from_other=False):
+        assert self._compatible_shape(other, ind, o_ind)
+        for b, o in zip(self._blocks, self._other_blocks(other)):
+            b.replace(o, ind=ind, o_ind=o_ind, remove_from_other=remove_from_other)
+
+    def almost_equal(self, other, ind=None, o_ind=None, rtol=None, atol=None):
+        assert self._compatible_shape(other, ind, o_ind)
+        return np.logical_and.reduce([b.almost_equal(o, ind=ind, o_ind=o_ind, rtol=rtol, atol=atol)
+                                      for b, o in zip(self._blocks, self._other_blocks(other))])
+
+    def add_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if other is not None:
+            assert self._compatible_shape(other, ind, o_ind)
+        return BlockVectorArray([b.add_mult(o, factor=factor, o_factor=o_factor, ind=ind, o_ind=o_ind)
+                                 for b, o in zip(self._blocks, self._other_blocks(other))])
+
+    def iadd_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if other is not None:
+            assert self._compatible_shape(other, ind, o_ind)
+        for b, o in zip(self._blocks, self._other_blocks(other)):
+            b.iadd_mult(o, factor=factor, o_factor=o_factor, ind=ind, o_ind=o_ind)
+        return self
+
+    def axpy(self, alpha, x, ind=None, x_ind=None):
+        for b, o in zip(self._blocks, self._other_blocks(x)):
+            b.axpy(alpha, o, ind=ind, x_ind=x_ind)
+        return self
+
+    def iadd_lincomb(self, coefficients, other, ind=None, o_ind=None):
+        for b, o in zip(self._blocks, self._other_blocks(other)):
+            b.iadd_lincomb(coefficients, o, ind=ind, o_ind=o_ind)
+        return self
+
+    def prod(self, other, ind=None, o_ind=None, pairwise=True):
+        return sum(b.prod(o, ind=ind, o_ind=o_ind, pairwise=pairwise)
+                   for b, o in zip(self._blocks, self._other_blocks(other)))
+
+    def gramian(self, ind=None):
+        return sum(b.gramian(ind=ind) for b in self._blocks)
+
+    def lincomb(self, factors, ind=None):
+        return BlockVectorArray([b.lincomb(factors, ind=ind) for b in self._blocks])
+
+    def lp_norm(self, p, ind=None):
+        block_norms = [b.lp_norm(p, ind=ind) for b in self._blocks]
+        if p == 0:
+            return np.max(block_norms, axis=0)
+        return np.sum(np.power(block_norms, p), axis=0) ** (1 / p)
+
+    def __str__(self):
+        return 'BlockVectorArray of {} vectors with block dimensions {}'.format(len(self), self.block_dims)
+
+    def __repr__(self):
+        return 'BlockVectorArray({})'.format(', '.join(repr(b) for b in self._blocks))
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pyMor project (http://www.pymor.org).
+# Copyright Holders: Felix Albrecht, Rene Milk, Stephan Rave
+# License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import atexit
+import multiprocessing
+import threading
+import traceback
+from itertools import count
+
+import numpy as np
+
+from pymor.core.interfaces import BasicInterface
+from pymor.la.interfaces import VectorArray, Communicable
+from pymor.la.numpyvectorarray import NumpyVectorArray
+
+
+class LocalWorkerPool(BasicInterface):
+    '''Pool of local worker processes holding the partitions of `DistributedVectorArrays`.
+
+    Each worker stores its partitions as `NumpyVectorArrays` and executes the
+    methods of `DistributedVectorArray` on them when instructed by the
+    master process. The workers are connected to the master via pipes and are
+    terminated by `close` or at interpreter exit.
+
+    Parameters
+    ----------
+    num_workers
+        The number of worker processes. If None, the number of CPUs.
+    '''
+
+    def __init__(self, num_workers=None):
+        num_workers = num_workers or multiprocessing.cpu_count()
+        self._connections = []
+        self._processes = []
+        for _ in xrange(num_workers):
+            conn, worker_conn = multiprocessing.Pipe()
+            p = multiprocessing.Process(target=_worker_loop, args=(worker_conn,))
+            p.daemon = True
+            p.start()
+            worker_conn.close()
+            self._connections.append(conn)
+            self._processes.append(p)
+        self._uids = count()
+        self._garbage = []
+        self._lock = threading.Lock()
+        _pools.append(self)
+
+    def __len__(self):
+        return len(self._connections)
+
+    def new_uid(self):
+        return next(self._uids)
+
+    def release(self, uid):
+        '''Mark the partitions with the given `uid` for deletion by the workers.
+
+        The partitions are deleted together with the next command sent to the
+        workers, so that this method can be safely called from `__del__`.
+        '''
+        self._garbage.append(uid)
+
+    def execute(self, commands):
+        '''Execute one command on each worker and return the list of their results.
+
+        Each command is a tuple `(uid, method, args, kwargs, store_uid)`. The worker
+        calls `method` of its partition with id `uid` (or the module level function
+        `method` if `uid` is None), where all `DistributedVectorArrays` in `args`
+        and `kwargs` are replaced by the corresponding local partitions. If
+        `store_uid` is not None, the result is stored as partition `store_uid`.
+
+        Returns
+        -------
+        List of tuples `(result, length, dtype)` where `length` and `dtype` describe
+        the partition `store_uid` if given, or partition `uid` otherwise.
+        '''
+        assert len(commands) == len(self._connections)
+        with self._lock:
+            garbage, self._garbage = self._garbage, []
+            for conn, command in zip(self._connections, commands):
+                conn.send((garbage, command))
+            results = [conn.recv() for conn in self._connections]
+        for result in results:
+            if isinstance(result, _WorkerError):
+                raise RuntimeError('Error in worker process:\n' + result.traceback)
+        return results
+
+    def execute_all(self, uid, method, args=(), kwargs=None, store_uid=None):
+        '''Execute the same command on all workers (see `execute`).'''
+        return self.execute([(uid, method, args, kwargs or {}, store_uid)] * len(self))
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.send(None)
+                    conn.close()
+                except (IOError, EOFError):
+                    pass
+            for p in self._processes:
+                p.join(1)
+            self._connections, self._processes = [], []
+        if self in _pools:
+            _pools.remove(self)
+
+
+_pools = []
+_default_pool = None
+
+
+def default_pool():
+    '''The `LocalWorkerPool` used by `DistributedVectorArray` if no pool is specified.'''
+    global _default_pool
+    if _default_pool is None or not len(_default_pool):
+        _default_pool = LocalWorkerPool()
+    return _default_pool
+
+
+@atexit.register
+def _close_pools():
+    for pool in list(_pools):
+        pool.close()
+
+
+class _WorkerError(object):
+
+    def __init__(self, traceback):
+        self.traceback = traceback
+
+
+class _Partition(object):
+    '''Placeholder for the local partition with id `uid` in a worker command.'''
+
+    def __init__(self, uid):
+        self.uid = uid
+
+
+def _worker_loop(conn):
+    partitions = {}
+
+    def resolve(arg):
+        return partitions[arg.uid] if isinstance(arg, _Partition) else arg
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        garbage, (uid, method, args, kwargs, store_uid) = message
+        for g in garbage:
+            partitions.pop(g, None)
+        try:
+            args = [resolve(a) for a in args]
+            kwargs = {k: resolve(v) for k, v in kwargs.iteritems()}
+            if uid is None:
+                result = _worker_functions[method](*args, **kwargs)
+            else:
+                result = getattr(partitions[uid], method)(*args, **kwargs)
+            if store_uid is not None:
+                partitions[store_uid] = result
+                uid = store_uid
+                result = None
+            elif uid is not None and result is partitions[uid]:
+                # in-place operations return the partition itself, which must not be sent back
+                result = None
+            described = partitions.get(uid)
+            if described is None:
+                conn.send((result, 0, None))
+            else:
+                conn.send((result, len(described), described.dtype))
+        except Exception:
+            conn.send(_WorkerError(traceback.format_exc()))
+
+
+_worker_functions = {'empty': NumpyVectorArray.empty,
+                     'from_numpy': lambda array: NumpyVectorArray(array, copy=True)}
+
+
+class DistributedVectorArray(VectorArray, Communicable):
+    '''`VectorArray` whose vectors are partitioned by their DOFs across local worker processes.
+
+    The DOFs `partition[k][0]:partition[k][1]` of all vectors are stored as a
+    `NumpyVectorArray` in the `k`-th worker of a `LocalWorkerPool`. Operations
+    modifying the vectors are executed by all workers in parallel on their local
+    DOFs. `prod`, `gramian`, `lincomb`, `lp_norm` and `almost_equal` only transfer
+    the local results, which are reduced by the master process. Only `data` gathers
+    the vectors themselves, which raises a `CommunicationError` if communication
+    has been disabled (see `Communicable`).
+
+    Arrays which are combined with each other have to be `DistributedVectorArrays`
+    living in the same pool with the same partition.
+
+    Parameters
+    ----------
+    dim
+        The dimension of the vectors.
+    dtype
+        The dtype of the vectors' entries. If None, `numpy.float64`.
+    reserve
+        Number of vectors for which space is allocated initially.
+    pool
+        The `LocalWorkerPool` holding the vectors. If None, `default_pool()` is used.
+    '''
+
+    @classmethod
+    def empty(cls, dim, reserve=0, dtype=None, pool=None):
+        return cls(dim, dtype=dtype, reserve=reserve, pool=pool)
+
+    @classmethod
+    def from_numpy(cls, array, pool=None):
+        '''Scatter the rows of a 2D `numpy.ndarray` across the workers of `pool`.'''
+        array = np.array(array, ndmin=2, copy=False)
+        U = cls.__new__(cls)
+        U._setup(array.shape[1], pool)
+        results = U.pool.execute([(None, 'from_numpy', (array[:, start:stop],), {}, U._uid)
+                                  for start, stop in U.partition])
+        U._update(results)
+        return U
+
+    def __init__(self, dim, dtype=None, reserve=0, pool=None):
+        self._setup(dim, pool)
+        self._update(self.pool.execute([(None, 'empty', (stop - start, reserve, dtype), {}, self._uid)
+                                        for start, stop in self.partition]))
+
+    def _setup(self, dim, pool):
+        self.pool = pool or default_pool()
+        n = len(self.pool)
+        self.partition = tuple((k * dim // n, (k + 1) * dim // n) for k in xrange(n))
+        self._dim = dim
+        self._uid = self.pool.new_uid()
+        self._len = 0
+        self._dtype = None
+
+    def _update(self, results):
+        _, self._len, self._dtype = results[0]
+        return [r[0] for r in results]
+
+    def _call(self, method, *args, **kwargs):
+        '''Call `method` of all partitions, returning the list of local results.'''
+        args = tuple(self._resolve(a) for a in args)
+        kwargs = {k: self._resolve(v) for k, v in kwargs.iteritems()}
+        return self._update(self.pool.execute_all(self._uid, method, args, kwargs))
+
+    def _call_new(self, method, *args, **kwargs):
+        '''Call `method` of all partitions, returning the resulting `DistributedVectorArray`.'''
+        args = tuple(self._resolve(a) for a in args)
+        kwargs = {k: self._resolve(v) for k, v in kwargs.iteritems()}
+        U = DistributedVectorArray.__new__(DistributedVectorArray)
+        U.pool, U.partition, U._dim = self.pool, self.partition, self._dim
+        U._uid = self.pool.new_uid()
+        U._update(self.pool.execute_all(self._uid, method, args, kwargs, store_uid=U._uid))
+        return U
+
+    def _resolve(self, arg):
+        if isinstance(arg, VectorArray):
+            assert isinstance(arg, DistributedVectorArray)
+            assert arg.pool is self.pool and arg.partition == self.partition
+            return _Partition(arg._uid)
+        return arg
+
+    def __del__(self):
+        try:
+            self.pool.release(self._uid)
+        except AttributeError:
+            pass
+
+    def _data(self):
+        return np.hstack(self._call('_data'))
+
+    def to_numpy(self):
+        '''Gather the vectors as a `NumpyVectorArray` (see `data`).'''
+        return NumpyVectorArray(self.data, copy=False)
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def dim(self):
+        return self._dim
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    def copy(self, ind=None, deep=True):
+        return self._call_new('copy', ind=ind)
+
+    def append(self, other, o_ind=None, remove_from_other=False):
+        assert self.dim == other.dim
+        self._call('append', other, o_ind=o_ind, remove_from_other=remove_from_other)
+        if remove_from_other and other is not self:
+            other._call('__len__')
+
+    def reserve(self, capacity):
+        self._call('reserve', capacity)
+
+    def shrink_to_fit(self):
+        self._call('shrink_to_fit')
+
+    def remove(self, ind):
+        self._call('remove', ind)
+
+    def replace(self, other, ind=None, o_ind=None, remove_from_other=False):
+        assert self._compatible_shape(other, ind, o_ind)
+        self._call('replace', other, ind=ind, o_ind=o_ind, remove_from_other=remove_from_other)
+        if remove_from_other and other is not self:
+            other._call('__len__')
+
+    def almost_equal(self, other, ind=None, o_ind=None, rtol=None, atol=None):
+        assert self._compatible_shape(other, ind, o_ind)
+        # float_cmp compares component-wise, so the vectors are equal iff all partitions are
+        return np.logical_and.reduce(self._call('almost_equal', other, ind=ind, o_ind=o_ind, rtol=rtol, atol=atol))
+
+    def add_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if other is not None:
+            assert self._compatible_shape(other, ind, o_ind)
+        return self._call_new('add_mult', other, factor=factor, o_factor=o_factor, ind=ind, o_ind=o_ind)
+
+    def iadd_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if other is not None:
+            assert self._compatible_shape(other, ind, o_ind)
+        self._call('iadd_mult', other, factor=factor, o_factor=o_factor, ind=ind, o_ind=o_ind)
+        return self
+
+    def axpy(self, alpha, x, ind=None, x_ind=None):
+        self._call('axpy', alpha, x, ind=ind, x_ind=x_ind)
+        return self
+
+    def iadd_lincomb(self, coefficients, other, ind=None, o_ind=None):
+        self._call('iadd_lincomb', coefficients, other, ind=ind, o_ind=o_ind)
+        return self
+
+    def prod(self, other, ind=None, o_ind=None, pairwise=True):
+        assert self.dim == other.dim
+        return sum(self._call('prod', other, ind=ind, o_ind=o_ind, pairwise=pairwise))
+
+    def gramian(self, ind=None):
+        return sum(self._call('gramian', ind=ind))
+
+    def lincomb(self, factors, ind=None):
+        return self._call_new('lincomb', factors, ind=ind)
+
+    def lp_norm(self, p, ind=None):
+        local_norms = self._call('lp_norm', p, ind=ind)
+        if p == 0:
+            return np.max(local_norms, axis=0)
+        return np.sum(np.power(local_norms, p), axis=0) ** (1 / p)
+
+    def __str__(self):
+        return 'DistributedVectorArray of {} vectors of dimension {} on {} workers'.format(
+            self._len, self.dim, len(self.pool))
+
+    def __repr__(self):
+        return 'DistributedVectorArray(dim={}, len={}, dtype={}, partition={})'.format(
+            self.dim, self._len, self._dtype, self.partition)
@@ -9,10 +9,12 @@ import numpy as np
 from pymor.core import defaults
 from pymor.core.exceptions import AccuracyError
 from pymor.tools import float_cmp_all
+from pymor.la.basic import duplicate_indices
+from pymor.la.numpyvectorarray import NumpyVectorArray
 from pymor.operators import OperatorInterface
 
 
-def gram_schmidt(A, product=None, tol=None, offset=0, find_duplicates=True,
+def gram_schmidt(A, product=None, tol=None, offset=0, find_duplicates=True, reuse_product=False,
                  check=None, check_tol=None):
     '''Orthonormnalize a matrix using the Gram-Schmidt algorithm.
 
@@ -29,6 +31,13 @@ def gram_schmidt(A, product=None, tol=None, offset=0, find_duplicates=True,
         algorithm at the `offset + 1`-th vector.
     find_duplicates
         If `True`, eliminate duplicate vectors before the main loop.
+    reuse_product
+        If `True` and `product` is given, the product is applied to all vectors at
+        once before the main loop. The images are stored alongside `A` and updated with
+        the same linear combinations as the vectors, so that no further applications of
+        `product` are needed. This pays off if applying `product` is more expensive than
+        updating the images, but needs memory for a second copy of `A`. Otherwise,
+        `product` is applied once to each vector when it is normalized.
     check
         If `True`, check if the resulting VectorArray is really orthonormal. If `None`, use
         `defaults.gram_schmidt_check`.
@@ -42,40 +51,44 @@ def gram_schmidt(A, product=None, tol=None, offset=0, find_duplicates=True,
     '''
 
     tol = defaults.gram_schmidt_tol if tol is None else tol
-    check = defaults.gram_schmidt_tol if check is None else check
+    check = defaults.gram_schmidt_check if check is None else check
     check_tol = check_tol or defaults.gram_schmidt_check_tol
 
-    # find duplicate vectors since in some circumstances these cannot be detected in the main loop
-    # (is this really needed or is in this cases the tolerance poorly chosen anyhow)
     if find_duplicates:
-        for i in xrange(len(A)):
-            duplicates = A.almost_equal(A, ind=[i], o_ind=xrange(max(offset, i + 1), len(A)))
-            if np.any(duplicates):
-                A.remove(np.where(duplicates))
+        _remove_duplicates(A, offset)
+
+    products = _Products(A, product, reuse_product)
 
     # main loop
     i = 0
     remove = []
     while i < len(A):
 
+        # image of the i-th vector under product, if it has to be computed
+        PAi = None
+
         if i >= offset:
-            if product is None:
-                norm = A.l2_norm(ind=[i])[0]
+            if product is not None and not reuse_product:
+                PAi = product.apply(A, ind=[i])
+                norm = np.sqrt(np.abs(A.prod(PAi, ind=[i])[0]))
             else:
-                norm = np.sqrt(product.apply2(A, A, ind=[i], o_ind=[i], pairwise=True))[0]
+                norm = products.norms([i])[0]
 
             if norm < tol:
                 remove.append(i)
+                i += 1
                 continue
             else:
-                A.iadd_mult(None, factor=1/norm, o_factor=0, ind=[i])
+                products.scale(1/norm, [i])
+                if PAi is not None:
+                    PAi.iadd_mult(None, factor=1/norm, o_factor=0)
 
-        for j in xrange(max(offset, i + 1), len(A)):
-            if product is None:
-                p = A.prod(A, ind=[j], o_ind=[i], pairwise=True)[0]
-            else:
-                p = product.apply2(A, A, V_ind=[j], U_ind=[i], pairwise=True)[0]
-            A.iadd_mult(A, o_factor=-p, ind=[j], o_ind=[i])
+        # orthogonalize all remaining vectors against the i-th vector at once
+        rest = xrange(max(offset, i + 1), len(A))
+        if len(rest) > 0:
+            # the coefficients are <a_i, a_j>, as prod is antilinear in its first argument
+            p = (products.prod([i], rest) if PAi is None else PAi.prod(A, o_ind=rest, pairwise=False)).T
+            products.iadd_lincomb(-p, rest, [i])
 
         i += 1
 
@@ -83,13 +96,228 @@ def gram_schmidt(A, product=None, tol=None, offset=0, find_duplicates=True,
         A.remove(remove)
 
     if check:
-        if not float_cmp_all(A.prod(A, pairwise=False), np.eye(len(A)), check_tol):
-            err = np.max(np.abs(A.prod(A, pairwise=False) - np.eye(len(A))))
-            raise AccuracyError('result not orthogonal (max err={})'.format(err))
+        _check_orthonormality(A, product, check_tol)
+
+    return A
+
+
+def block_gram_schmidt(A, product=None, tol=None, offset=0, block_size=32, find_duplicates=True, reuse_product=False,
+                       check=None, check_tol=None):
+    '''Orthonormalize a matrix using the block classical Gram-Schmidt algorithm with reorthogonalization.
+
+    The vectors are processed in blocks of `block_size` vectors. Each block is
+    orthogonalized against all previous vectors at once with a single `prod` and
+    `iadd_lincomb` call, i.e. with matrix-matrix products. Afterwards, the vectors of
+    the block are orthogonalized against each other one after another. In both
+    steps the orthogonalization is repeated once if the norm of a vector has been
+    reduced by more than a factor of `1/sqrt(2)` ("twice is enough"), so that the
+    result stays orthonormal for nearly linearly dependent vectors. Apart from
+    that, the result agrees with the result of `gram_schmidt` up to rounding errors.
+
+    Parameters
+    ----------
+    A
+        The VectorArray which is to be orthonormalized.
+    product
+        The scalar product w.r.t. which to orthonormalize.
+    tol
+        Tolerance to determine a linear dependent row.
+    offset
+        Assume that the first `offset` vectors are already orthonormal and start the
+        algorithm at the `offset + 1`-th vector.
+    block_size
+        Number of vectors which are orthogonalized at once against the previous vectors.
+    find_duplicates
+        If `True`, eliminate duplicate vectors before the main loop.
+    reuse_product
+        See `gram_schmidt`.
+    check
+        If `True`, check if the resulting VectorArray is really orthonormal. If `None`, use
+        `defaults.gram_schmidt_check`.
+    check_tol
+        Tolerance for the check. If `None`, `defaults.gram_schmidt_check_tol` is used.
+
+    Returns
+    -------
+    The orthonormalized matrix.
+    '''
+
+    tol = defaults.gram_schmidt_tol if tol is None else tol
+    check = defaults.gram_schmidt_check if check is None else check
+    check_tol = check_tol or defaults.gram_schmidt_check_tol
+
+    if find_duplicates:
+        _remove_duplicates(A, offset)
+
+    products = _Products(A, product, reuse_product)
+
+    k = offset
+    while k < len(A):
+        block = range(k, min(k + block_size, len(A)))
+        if k > 0:
+            _orthogonalize(products, block, xrange(k))
+        norms = _orthonormalize_block(products, block, tol)
+        k += np.count_nonzero(norms >= tol)
+
+    if check:
+        _check_orthonormality(A, product, check_tol)
 
     return A
 
 
+def orthonormalize_against(A, basis=None, product=None, tol=None, images=None, basis_images=None):
+    '''Orthonormalize the vectors in `A` in place against an orthonormal basis and each other.
+
+    This is the step `block_gram_schmidt` performs for each block: `A` is orthogonalized
+    against all vectors of `basis` at once, repeating the projection once if necessary,
+    and the vectors of `A` are then orthonormalized against each other one after another.
+    Vectors whose norm drops below `tol` are removed from `A`.
+
+    Parameters
+    ----------
+    A
+        The VectorArray which is to be orthonormalized.
+    basis
+        VectorArray of orthonormal vectors against which `A` is orthogonalized. If None,
+        `A` is only orthonormalized.
+    product
+        The scalar product w.r.t. which to orthonormalize.
+    tol
+        Tolerance to determine a linear dependent vector. If None, `defaults.gram_schmidt_tol`
+        is used.
+    images
+        If not None, the images of `A` under `product`. They are updated alongside `A`,
+        so that `product` is not applied again.
+    basis_images
+        The images of `basis` under `product`. Has to be given if `images` is given.
+
+    Returns
+    -------
+    coefficients
+        The coefficients of the projections of the vectors in `A` onto `basis` (one row
+        per vector).
+    norms
+        The norms of the vectors in `A` after orthogonalization against `basis` and the
+        preceding vectors of `A`.
+    '''
+    assert images is None or basis is None or basis_images is not None
+    tol = defaults.gram_schmidt_tol if tol is None else tol
+    products = _Products(A, product, False, PA=images)
+    coefficients = np.zeros((len(A), 0))
+    if basis is not None and len(basis) > 0 and len(A) > 0:
+        basis = _Products(basis, product, False, PA=basis_images)
+        coefficients = _orthogonalize(products, range(len(A)), range(len(basis.A)), basis)[0]
+    norms = _orthonormalize_block(products, range(len(A)), tol)
+    return coefficients, norms
+
+
+def _orthogonalize(products, ind, o_ind, basis=None):
+    '''Project A[ind] onto the orthogonal complement of the orthonormal vectors B[o_ind].
+
+    `B` is the array of `basis` or `A` itself if `basis` is None. The projection is
+    repeated once if the norm of a vector has been reduced by more than a factor of
+    `1/sqrt(2)`. Returns the accumulated projection coefficients (one row per vector
+    in `ind`) and the new norms.
+    '''
+    basis = products if basis is None else basis
+    old_norms = products.norms(ind)
+    coefficients = 0
+    for _ in xrange(2):
+        c = basis.prod(o_ind, ind, products).T
+        products.iadd_lincomb(-c, ind, o_ind, basis)
+        coefficients = coefficients + c
+        new_norms = products.norms(ind)
+        if np.all(new_norms >= old_norms / np.sqrt(2)):
+            break
+        old_norms = new_norms
+    return coefficients, new_norms
+
+
+def _orthonormalize_block(products, block, tol):
+    '''Orthonormalize the vectors A[block] against each other one after another.
+
+    Vectors whose norm drops below `tol` are removed. Returns the norms of the
+    vectors after orthogonalization against the preceding vectors of the block.
+    '''
+    accepted, remove = [], []
+    norms = np.empty(len(block))
+    for i, j in enumerate(block):
+        norms[i] = _orthogonalize(products, [j], accepted)[1][0] if accepted else products.norms([j])[0]
+        if norms[i] < tol:
+            remove.append(j)
+        else:
+            products.scale(1/norms[i], [j])
+            accepted.append(j)
+    if remove:
+        products.remove(remove)
+    return norms
+
+
+class _Products(object):
+    '''Scalar products of the vectors in `A`, keeping track of the images of `A` under `product`.
+
+    If `reuse` is True and `product` is given, `product` is applied to `A` once and the
+    images are updated alongside the vectors by `scale`, `iadd_lincomb` and `remove`.
+    Already known images can be passed as `PA`.
+    '''
+
+    def __init__(self, A, product, reuse, PA=None):
+        self.A = A
+        self.product = product
+        if PA is None and product is not None and reuse:
+            PA = product.apply(A)
+        self.PA = PA
+
+    def prod(self, ind, o_ind, other=None):
+        '''Matrix of the scalar products of A[ind] and B[o_ind], where `B` is `other.A` or `A`.'''
+        other = self if other is None else other
+        if self.product is None:
+            return self.A.prod(other.A, ind=ind, o_ind=o_ind, pairwise=False)
+        elif other.PA is None:
+            return self.product.apply2(self.A, other.A, V_ind=ind, U_ind=o_ind, pairwise=False)
+        return self.A.prod(other.PA, ind=ind, o_ind=o_ind, pairwise=False)
+
+    def norms(self, ind):
+        if self.product is None:
+            return self.A.l2_norm(ind=ind)
+        elif self.PA is None:
+            norms_squared = self.product.apply2(self.A, self.A, V_ind=ind, U_ind=ind, pairwise=True)
+        else:
+            norms_squared = self.A.prod(self.PA, ind=ind, o_ind=ind, pairwise=True)
+        return np.sqrt(np.abs(norms_squared))
+
+    def scale(self, factor, ind):
+        self.A.iadd_mult(None, factor=factor, o_factor=0, ind=ind)
+        if self.PA is not None:
+            self.PA.iadd_mult(None, factor=factor, o_factor=0, ind=ind)
+
+    def iadd_lincomb(self, coefficients, ind, o_ind, other=None):
+        other = self if other is None else other
+        self.A.iadd_lincomb(coefficients, other.A, ind=ind, o_ind=o_ind)
+        if self.PA is not None:
+            self.PA.iadd_lincomb(coefficients, other.PA, ind=ind, o_ind=o_ind)
+
+    def remove(self, ind):
+        self.A.remove(ind)
+        if self.PA is not None:
+            self.PA.remove(ind)
+
+
+def _remove_duplicates(A, offset):
+    # find duplicate vectors since in some circumstances these cannot be detected in the main loop
+    # (is this really needed or is in this cases the tolerance poorly chosen anyhow)
+    duplicates = duplicate_indices(A, offset=offset)
+    if duplicates:
+        A.remove(duplicates)
+
+
+def _check_orthonormality(A, product, check_tol):
+    G = A.gramian() if product is None else product.apply2(A, A, pairwise=False)
+    if not float_cmp_all(G, np.eye(len(A)), check_tol):
+        err = np.max(np.abs(G - np.eye(len(A))))
+        raise AccuracyError('result not orthogonal (max err={})'.format(err))
+
+
 def numpy_gram_schmidt(A, product=None, tol=None, row_offset=0, find_row_duplicates=True, find_col_duplicates=False,
                        check=None, check_tol=None):
     '''Orthonormnalize a matrix using the Gram-Schmidt algorithm.
@@ -130,17 +358,11 @@ def numpy_gram_schmidt(A, product=None, tol=None, row_offset=0, find_row_duplica
     # find duplicate rows since in some circumstances these cannot be detected in the main loop
     # (is this really needed or is in this cases the tolerance poorly chosen anyhow)
     if find_row_duplicates:
-        for i in xrange(A.shape[0]):
-            for j in xrange(max(row_offset, i + 1), A.shape[0]):
-                if float_cmp_all(A[i], A[j]):
-                    A[j] = 0
+        A[duplicate_indices(NumpyVectorArray(A, copy=False), offset=row_offset)] = 0
 
     # find duplicate columns
     if find_col_duplicates:
-        for i in xrange(A.shape[1]):
-            for j in xrange(i, A.shape[1]):
-                if float_cmp_all(A[:, i], A[:, j]):
-                    A[:, j] = 0
+        A[:, duplicate_indices(NumpyVectorArray(A.T, copy=False))] = 0
 
     # main loop
     for i in xrange(A.shape[0]):
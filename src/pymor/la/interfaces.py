@@ -12,6 +12,7 @@ from scipy.sparse import issparse
 
 from pymor.core.interfaces import BasicInterface, abstractmethod, abstractproperty, abstractclassmethod
 from pymor.core.exceptions import CommunicationError
+from pymor.core.logger import getLogger
 
 
 class Communicable(BasicInterface):
@@ -27,7 +28,7 @@ class Communicable(BasicInterface):
 
     @communication.setter
     def communication(self, v):
-        assert v in set('raise', 'warn', 'enable')
+        assert v in ('raise', 'warn', 'enable')
         self._communication = v
 
     def enable_communication(self):
@@ -56,7 +57,7 @@ class Communicable(BasicInterface):
 
 class VectorArray(BasicInterface):
     @abstractclassmethod
-    def empty(cls, dim, reserve=0):
+    def empty(cls, dim, reserve=0, dtype=None):
         '''Create an empty VectorArray
 
         Parameters
@@ -65,6 +66,8 @@ class VectorArray(BasicInterface):
             The dimension of the array.
         reserve
             Hint for the backend to which length the array will grow.
+        dtype
+            The numpy dtype of the vectors' entries. If None, `numpy.float64`.
 
         Returns
         -------
@@ -85,8 +88,17 @@ class VectorArray(BasicInterface):
         '''
         pass
 
+    @abstractproperty
+    def dtype(self):
+        '''The numpy dtype of the entries of the vectors.
+
+        Scalar products and norms are computed with at least the precision of
+        `defaults.vectorarray_product_dtype`, independent of the dtype of the array.
+        '''
+        pass
+
     @abstractmethod
-    def copy(self, ind=None):
+    def copy(self, ind=None, deep=True):
         '''Returns a copy of a subarray.
 
         Parameters
@@ -94,6 +106,12 @@ class VectorArray(BasicInterface):
         ind
             If None, a copy of the whole array is returned. Otherwise an
             iterable of the indices of the vectors that are to be copied.
+        deep
+            If False, the implementation may return a copy which shares the
+            memory of its vectors with `self` until one of both arrays is modified
+            (copy-on-write). The returned array behaves like a deep copy in any
+            case, but modifications of the arrays returned by `data` are not
+            detected.
 
         Returns
         -------
@@ -119,6 +137,22 @@ class VectorArray(BasicInterface):
         '''
         pass
 
+    def reserve(self, capacity):
+        '''Hint for the backend that the array will grow to a length of `capacity`.
+
+        Implementations which store the vectors in a contiguous buffer can use this
+        to preallocate memory for subsequent calls of `append`. The default
+        implementation does nothing.
+        '''
+        pass
+
+    def shrink_to_fit(self):
+        '''Release memory which has been reserved for appending vectors.
+
+        The default implementation does nothing.
+        '''
+        pass
+
     @abstractmethod
     def remove(self, ind):
         '''Remove vectors to the array.
@@ -220,6 +254,68 @@ class VectorArray(BasicInterface):
         '''In-place version of `add_mult`.'''
         pass
 
+    def axpy(self, alpha, x, ind=None, x_ind=None):
+        '''In-place BLAS-style update `self[ind] += alpha * x[x_ind]`.
+
+        The dimensions of `self` and `x` have to agree. If the length
+        of `x` (`x_ind`) is 1, the one specified vector is added to all
+        specified vectors of `self`.
+
+        The default implementation calls `iadd_mult`.
+
+        Parameters
+        ----------
+        alpha
+            The factor with which the vectors in `x` are multiplied.
+        x
+            A `VectorArray` containing the summands.
+        ind
+            If None, all vectors in `self` are updated. Otherwise an iterable
+            of the indices of the vectors to be updated.
+        x_ind
+            If None, the whole `x` array is added. Otherwise an iterable
+            of the indices of the vectors to be added.
+
+        Returns
+        -------
+        `self`
+        '''
+        if alpha == 0:
+            return self
+        return self.iadd_mult(x, o_factor=alpha, ind=ind, o_ind=x_ind)
+
+    def iadd_lincomb(self, coefficients, other, ind=None, o_ind=None):
+        '''In-place addition of linear combinations of the vectors in `other`.
+
+        This method forms ::
+
+            self[ind][i] += ∑_j other[o_ind][j] * coefficients[i,j]
+
+        The default implementation calls `lincomb` and `iadd_mult`.
+
+        Parameters
+        ----------
+        coefficients
+            A numpy array of dimension 2, with `coefficients.shape[0]` equal to
+            the number of updated vectors in `self` and `coefficients.shape[1]`
+            equal to the number of selected vectors in `other`.
+        other
+            A `VectorArray` containing the vectors to combine.
+        ind
+            If None, all vectors in `self` are updated. Otherwise an iterable
+            of the indices of the vectors to be updated.
+        o_ind
+            If None, all vectors in `other` are combined. Otherwise an iterable
+            of the indices of the vectors which are to be used.
+
+        Returns
+        -------
+        `self`
+        '''
+        assert coefficients.ndim == 2
+        assert coefficients.shape[0] == (len(self) if ind is None else len(ind))
+        return self.iadd_mult(other.lincomb(coefficients, ind=o_ind), ind=ind)
+
     @abstractmethod
     def prod(self, other, ind=None, o_ind=None, pairwise=True):
         '''Returns the scalar products between `VectorArray` elements.
@@ -250,6 +346,8 @@ class VectorArray(BasicInterface):
         that ::
 
             result[i, j] = ( self[ind][i], other[o_ind][j] ).
+
+        For complex arrays, the scalar product is antilinear in the first argument.
         '''
         pass
 
@@ -318,9 +416,9 @@ class VectorArray(BasicInterface):
         if self.dim != other.dim:
             return False
         if broadcast:
-            if o_ind == None and len(other) == 1:
+            if o_ind is None and len(other) == 1:
                 return True
-            elif o_ind != None and len(o_ind) == 1:
+            elif o_ind is not None and len(o_ind) == 1:
                 return True
         if ind is None:
             if len(self) == 1:
@@ -328,14 +426,14 @@ class VectorArray(BasicInterface):
             if o_ind is None:
                 return len(self) == len(other)
             else:
-                return len(self) == len(oind)
+                return len(self) == len(o_ind)
         else:
             if len(ind) == 1:
                 return True
             if o_ind is None:
                 return len(ind) == len(other)
             else:
-                return len(ind) == len(oind)
+                return len(ind) == len(o_ind)
 
     def __add__(self, other):
         return self.add_mult(other)
@@ -349,10 +447,10 @@ class VectorArray(BasicInterface):
         return self.add_mult(other, factor=-1.)
 
     def __mul__(self, other):
-        return self.add_mult(self, factor=other, o_factor=0.)
+        return self.add_mult(None, factor=other, o_factor=0.)
 
     def __imul__(self, other):
-        return self.iadd_mult(self, factor=other, o_factor=0.)
+        return self.iadd_mult(None, factor=other, o_factor=0.)
 
     def __neg__(self):
         return self.add_mult(None, factor=-1, o_factor=0)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pyMor project (http://www.pymor.org).
+# Copyright Holders: Felix Albrecht, Rene Milk, Stephan Rave
+# License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+from itertools import izip
+from tempfile import TemporaryFile
+
+import numpy as np
+
+from pymor.la.interfaces import VectorArray, Communicable
+from pymor.la.numpyvectorarray import (NumpyVectorArray, _promote_for_product, _normalize_index, _index_blocks,
+                                       _paired_index_blocks, _check_cast)
+from pymor.tools import float_cmp
+
+
+class MemmapVectorArray(VectorArray, Communicable):
+    '''`VectorArray` implementation storing the vectors in a memory mapped file.
+
+    The vectors are stored as the rows of a `numpy.memmap`, so that arrays which are
+    larger than the available memory can be handled. All operations process the
+    vectors in chunks of at most `chunk_bytes` bytes, only the results of `prod`,
+    `lp_norm` and `almost_equal` are held in memory. The results of `copy`,
+    `add_mult` and `lincomb` are again `MemmapVectorArrays` backed by temporary files.
+
+    Vectors can be taken from `NumpyVectorArrays` and `MemmapVectorArrays` alike.
+    As for `NumpyVectorArray`, the dtype of the array is fixed.
+
+    Parameters
+    ----------
+    dim
+        The dimension of the vectors.
+    dtype
+        The dtype of the vectors' entries. If None, `numpy.float64`.
+    filename
+        The file in which to store the vectors. If None, an anonymous temporary file
+        is used, which is deleted as soon as the array is garbage collected. An
+        existing file is overwritten.
+    reserve
+        Number of vectors for which space in the file is allocated initially.
+    '''
+
+    chunk_bytes = 2**26
+    _growth_factor = 2
+
+    @classmethod
+    def empty(cls, dim, reserve=0, dtype=None, filename=None):
+        return cls(dim, dtype=dtype, filename=filename, reserve=reserve)
+
+    def __init__(self, dim, dtype=None, filename=None, reserve=0):
+        self._file = TemporaryFile() if filename is None else open(filename, 'w+b')
+        self._len = 0
+        self._array = np.empty((0, dim), dtype=np.float64 if dtype is None else dtype)
+        self._reallocate(reserve)
+
+    def _reallocate(self, capacity):
+        if capacity <= self._array.shape[0]:
+            return
+        row_bytes = self.dim * self.dtype.itemsize
+        self._file.truncate(capacity * row_bytes)
+        if row_bytes > 0:
+            self._array = np.memmap(self._file, dtype=self.dtype, mode='r+', shape=(capacity, self.dim))
+        else:
+            self._array = np.empty((capacity, self.dim), dtype=self.dtype)
+
+    def __getstate__(self):
+        '''The backing file cannot be pickled, so the vectors are loaded into memory.'''
+        return {'data': np.array(self._array[:self._len])}
+
+    def __setstate__(self, d):
+        '''The vectors are written to a new temporary file.'''
+        data = d['data']
+        self.__init__(data.shape[1], dtype=data.dtype, reserve=len(data))
+        self._array[:len(data)] = data
+        self._len = len(data)
+
+    @property
+    def _chunk_size(self):
+        return max(self.chunk_bytes // max(self.dim * self.dtype.itemsize, 1), 1)
+
+    def _chunks(self, ind, length=None):
+        return _index_blocks(ind, self._len if length is None else length, self._chunk_size)
+
+    def _paired_chunks(self, other, ind, o_ind):
+        return _paired_index_blocks(ind, self._len, o_ind, other._len, self._chunk_size)
+
+    def _data(self):
+        return self._array[:self._len]
+
+    def _index(self, ind):
+        return _normalize_index(ind, self._len)
+
+    def _rows(self, ind):
+        return self._array[_normalize_index(ind, self._len)]
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def dim(self):
+        return self._array.shape[1]
+
+    @property
+    def dtype(self):
+        return self._array.dtype
+
+    def copy(self, ind=None, deep=True):
+        # a shallow copy would have to share the file, so always copy
+        C = MemmapVectorArray.empty(self.dim, reserve=self._len if ind is None else len(ind), dtype=self.dtype)
+        C.append(self, o_ind=ind)
+        return C
+
+    def append(self, other, o_ind=None, remove_from_other=False):
+        assert self.dim == other.dim
+        _check_cast(other.dtype, self.dtype)
+        len_other = other._len if o_ind is None else len(o_ind)
+        if self._len + len_other > self._array.shape[0]:
+            self._reallocate(max(self._len + len_other, int(self._array.shape[0] * self._growth_factor)))
+        pos = self._len
+        for o_chunk in self._chunks(o_ind, other._len):
+            rows = other._array[o_chunk]
+            self._array[pos:pos + len(rows)] = rows
+            pos += len(rows)
+        self._len = pos
+        if remove_from_other:
+            other.remove(o_ind)
+
+    def remove(self, ind):
+        if ind is None:
+            self._len = 0
+            return
+        keep = np.ones(self._len, dtype=bool)
+        keep[ind] = False
+        removed = np.flatnonzero(~keep)
+        if len(removed) == 0:
+            return
+        # move the blocks of remaining vectors chunk by chunk to avoid large temporaries
+        c = self._chunk_size
+        pos = int(removed[0])
+        for start, end in izip(removed + 1, np.append(removed[1:], self._len)):
+            for i in xrange(start, end, c):
+                n = min(c, end - i)
+                self._array[pos:pos + n] = self._array[i:i + n]
+                pos += n
+        self._len = pos
+
+    def replace(self, other, ind=None, o_ind=None, remove_from_other=False):
+        assert self._compatible_shape(other, ind, o_ind)
+        _check_cast(other.dtype, self.dtype)
+        # the vectors of self are overwritten chunk by chunk, so the source vectors have to be copied first
+        source, source_ind = (self.copy(o_ind), None) if other is self else (other, o_ind)
+        if ind is None:
+            self._len = 0
+            self.append(source, o_ind=source_ind)
+        else:
+            for chunk, o_chunk in self._paired_chunks(source, ind, source_ind):
+                self._array[chunk] = source._array[o_chunk]
+        if remove_from_other:
+            other.remove(o_ind)
+
+    def almost_equal(self, other, ind=None, o_ind=None, rtol=None, atol=None):
+        assert self._compatible_shape(other, ind, o_ind)
+        R = [np.all(float_cmp(self._array[chunk], other._array[o_chunk], rtol=rtol, atol=atol), axis=1)
+             for chunk, o_chunk in self._paired_chunks(other, ind, o_ind)]
+        return np.concatenate(R) if R else np.empty(0, dtype=bool)
+
+    def add_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if o_factor == 0:
+            R = self.copy(ind)
+            R.iadd_mult(None, factor=factor, o_factor=0)
+            return R
+        assert self._compatible_shape(other, ind, o_ind)
+        len_result = max(self._len if ind is None else len(ind), other._len if o_ind is None else len(o_ind))
+        dtype = np.result_type(self.dtype, other._array.dtype, factor, o_factor)
+        R = MemmapVectorArray.empty(self.dim, reserve=len_result, dtype=dtype)
+        for chunk, o_chunk in self._paired_chunks(other, ind, o_ind):
+            rows = self._array[chunk] * factor + other._array[o_chunk] * o_factor
+            R._array[R._len:R._len + len(rows)] = rows
+            R._len += len(rows)
+        return R
+
+    def iadd_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if o_factor == 0:
+            for chunk in self._chunks(ind):
+                self._array[chunk] *= factor
+        else:
+            assert self._compatible_shape(other, ind, o_ind)
+            for chunk, o_chunk in self._paired_chunks(other, ind, o_ind):
+                # other may be self, so form the scaled summand before modifying self
+                summand = other._array[o_chunk] * o_factor
+                rows = self._array[chunk]
+                rows *= factor
+                rows += summand
+                self._array[chunk] = rows
+        return self
+
+    def prod(self, other, ind=None, o_ind=None, pairwise=True):
+        if pairwise:
+            assert self._compatible_shape(other, ind, o_ind, broadcast=False)
+            R = []
+            for chunk, o_chunk in self._paired_chunks(other, ind, o_ind):
+                A, B = _promote_for_product(self._array[chunk], other._array[o_chunk])
+                R.append(np.sum(A.conj() * B, axis=1))
+            return np.concatenate(R) if R else np.empty(0)
+        else:
+            assert self.dim == other.dim
+            R = None
+            pos = 0
+            for chunk in self._chunks(ind):
+                A, = _promote_for_product(self._array[chunk])
+                A = A.conj()
+                o_pos = 0
+                for o_chunk in self._chunks(o_ind, other._len):
+                    B, = _promote_for_product(other._array[o_chunk])
+                    R_block = A.dot(B.T)
+                    if R is None:
+                        R = np.empty((self._len if ind is None else len(ind),
+                                      other._len if o_ind is None else len(o_ind)), dtype=R_block.dtype)
+                    R[pos:pos + len(A), o_pos:o_pos + len(B)] = R_block
+                    o_pos += len(B)
+                pos += len(A)
+            if R is None:
+                R = np.zeros((self._len if ind is None else len(ind), other._len if o_ind is None else len(o_ind)))
+            return R
+
+    def lincomb(self, factors, ind=None):
+        assert 1 <= factors.ndim <= 2
+        if factors.ndim == 1:
+            factors = factors[np.newaxis, ...]
+        if ind is None:
+            assert self._len == factors.shape[1]
+        else:
+            assert len(ind) == factors.shape[1]
+        dtype = np.result_type(self.dtype, factors)
+        R = MemmapVectorArray.empty(self.dim, reserve=len(factors), dtype=dtype)
+        R._len = len(factors)
+        # accumulate blocks of result vectors, reading the vectors of self once per block
+        for r_chunk in R._chunks(None):
+            block = np.zeros((r_chunk.stop - r_chunk.start, self.dim), dtype=dtype)
+            pos = 0
+            for chunk in self._chunks(ind):
+                rows = self._array[chunk]
+                block += factors[r_chunk, pos:pos + len(rows)].dot(rows)
+                pos += len(rows)
+            R._array[r_chunk] = block
+        return R
+
+    def lp_norm(self, p, ind=None):
+        R = []
+        for chunk in self._chunks(ind):
+            A, = _promote_for_product(self._array[chunk])
+            if p == 0:
+                R.append(np.max(np.abs(A), axis=1))
+            else:
+                R.append(np.sum(np.abs(A) ** p, axis=1))
+        R = np.concatenate(R) if R else np.empty(0)
+        return R if p == 0 else R ** (1 / p)
+
+    def to_numpy(self, ind=None):
+        '''Load the vectors into memory as a `NumpyVectorArray`.'''
+        return NumpyVectorArray(self._rows(ind), copy=True)
+
+    def __str__(self):
+        return 'MemmapVectorArray of {} vectors of dimension {}'.format(self._len, self.dim)
+
+    def __repr__(self):
+        return 'MemmapVectorArray(dim={}, len={}, dtype={})'.format(self.dim, self._len, self.dtype)
@@ -5,11 +5,14 @@
 
 from __future__ import absolute_import, division, print_function
 
+import weakref
 from numbers import Number
 
 import numpy as np
+from scipy.linalg.blas import get_blas_funcs
 from scipy.sparse import issparse
 
+from pymor.core import defaults
 from pymor.core.interfaces import BasicInterface, abstractmethod, abstractproperty
 from pymor.core.exceptions import CommunicationError
 from pymor.la.interfaces import VectorArray, Communicable
@@ -17,20 +20,48 @@ from pymor.tools import float_cmp
 
 
 class NumpyVectorArray(VectorArray, Communicable):
+    '''`VectorArray` implementation storing the vectors as the rows of a 2D `numpy.ndarray`.
+
+    The dtype of the array is fixed. Vectors which are appended or inserted via `replace`
+    are converted to it, which raises a `TypeError` if they are of a different kind (e.g.
+    complex vectors for a real array).
+
+    The array can hold more rows than vectors (see `reserve`). When `append` runs out of
+    capacity, the capacity is increased by `_growth_factor`, so appending vectors one at a
+    time has amortized cost O(dim). Use `shrink_to_fit` to release unused capacity.
+
+    `prod`, `gramian` and `lp_norm` process the vectors in blocks of at most `_block_bytes`
+    bytes, so that no temporaries of the size of the whole array are formed.
+
+    Indices which form a range with positive step (e.g. `[i]` or `xrange(offset, len(U))`)
+    are converted to slices, so that the selected vectors are accessed through views of the
+    array instead of copies. `copy(ind, deep=False)` returns such a view as a new
+    `NumpyVectorArray` with copy-on-write semantics: the view copies its vectors before it
+    is modified, and live views are detached before the array they have been created
+    from is modified.
+    '''
+
+    _growth_factor = 2
+    _block_bytes = 2**25
+    _cow = False
+    _views = None
+    _base = None
 
     @classmethod
-    def empty(cls, dim, reserve=0):
+    def empty(cls, dim, reserve=0, dtype=None):
         va = cls(np.empty((0, 0)))
-        va._array = np.empty((reserve, dim))
+        va._array = np.empty((reserve, dim), dtype=np.float64 if dtype is None else dtype)
         va._len = 0
         return va
 
     def __init__(self, object, dtype=None, copy=False, order=None, subok=False):
         if isinstance(object, np.ndarray) and not copy:
-            self._array = object
+            self._array = object if dtype is None else object.astype(dtype, copy=False)
         elif isinstance(object, Communicable):
             self._array = object.data
-            if copy:
+            if dtype is not None and self._array.dtype != dtype:
+                self._array = self._array.astype(dtype)
+            elif copy:
                 self._array = self._array.copy()
         elif issparse(object):
             self._array = np.array(object.todense(), copy=False)
@@ -44,6 +75,44 @@ class NumpyVectorArray(VectorArray, Communicable):
     def _data(self):
         return self._array[:self._len]
 
+    def _index(self, ind):
+        return _normalize_index(ind, self._len)
+
+    def _rows(self, ind):
+        '''The vectors with indices `ind` as a view of the array, if possible.'''
+        return self._array[_normalize_index(ind, self._len)]
+
+    def _own(self, array):
+        '''Replace the array by a newly allocated `array` which is not shared with any other `NumpyVectorArray`.'''
+        self._array = array
+        self._cow = False
+        self._views = None
+
+    def _prepare_write(self):
+        '''Ensure that modifying the array in place does not affect shallow copies and vice versa.'''
+        if self._cow:
+            self._array = self._array[:self._len].copy()
+            self._cow = False
+        if self._views:
+            for view_ref in self._views:
+                view = view_ref()
+                if view is not None and view._cow:
+                    view._array = view._array[:view._len].copy()
+                    view._cow = False
+            self._views = None
+
+    def __getstate__(self):
+        '''The weak references between views and the array they have been created from cannot be pickled.
+        Therefore only the vectors themselves are included in the state, so that an unpickled view
+        owns a copy of its vectors.
+        '''
+        d = {k: v for k, v in self.__dict__.iteritems() if k not in ('_views', '_base', '_cow')}
+        d['_array'] = self._array[:self._len]
+        return d
+
+    def __setstate__(self, d):
+        self.__dict__.update(d)
+
     def __len__(self):
         return self._len
 
@@ -51,77 +120,103 @@ class NumpyVectorArray(VectorArray, Communicable):
     def dim(self):
         return self._array.shape[1]
 
-    def copy(self, ind=None):
-        if ind is None:
-            return NumpyVectorArray(self._array[:self._len], copy=True)
-        else:
-            C = NumpyVectorArray(self._array[ind], copy=False)
-            if not C._array.flags['OWNDATA']:
-                C._array = np.array(C._array)
-            return C
+    @property
+    def dtype(self):
+        return self._array.dtype
+
+    def copy(self, ind=None, deep=True):
+        index = self._index(ind)
+        if deep or not isinstance(index, slice):
+            return NumpyVectorArray(np.array(self._array[index]), copy=False)
+        C = NumpyVectorArray(self._array[index], copy=False)
+        C._cow = True
+        # register the view at the array owning the memory, so that it is detached before the memory is modified
+        owner = self._base if self._cow else self
+        C._base = owner
+        if owner._views is None:
+            owner._views = []
+        owner._views = [r for r in owner._views if r() is not None]
+        owner._views.append(weakref.ref(C))
+        return C
 
     def append(self, other, o_ind=None, remove_from_other=False):
-        if o_ind == None:
-            len_other = other._len
-            if len_other <= self._array.shape[0] - self._len:
-                self._array[self._len:self._len + len_other] = other._array
-            else:
-                self._array = np.vstack((self._array[:self._len], other._array[:len_other]))
-            self._len += len_other
-        else:
-            len_other = len[o_ind]
-            if len_other <= self._array.shape[0] - self._len:
-                self._array[self._len:self._len + len_other] = other._array[o_ind]
-            else:
-                self._array = np.vstack((self._array[:self._len], other._array[o_ind]))
-            self._len += len_other
+        assert self.dim == other.dim
+        new_vectors = other._array[_normalize_index(o_ind, other._len)]
+        len_other = len(new_vectors)
+        capacity = self._array.shape[0]
+        if self._len + len_other > capacity:
+            # over-allocate geometrically, so that appending vectors one at a time has amortized cost O(dim)
+            capacity = max(self._len + len_other, int(capacity * self._growth_factor))
+        _check_cast(new_vectors.dtype, self._array.dtype)
+        if capacity > self._array.shape[0] or self._cow:
+            # a shallow copy must not write into the memory behind its vectors
+            self._reallocate(capacity)
+        self._array[self._len:self._len + len_other] = new_vectors
+        self._len += len_other
         if remove_from_other:
-            if o_ind == None:
-                other._array = np.zeros((0, other.dim))
-                other._len = 0
-            else:
-                other._array = other._array[list(x for x in xrange(len(other)) if x not in o_ind)]
-                other._len -= len(o_ind)
+            other.remove(o_ind)
+
+    def _reallocate(self, capacity):
+        array = np.empty((capacity, self.dim), dtype=self._array.dtype)
+        array[:self._len] = self._array[:self._len]
+        self._own(array)
+
+    def reserve(self, capacity):
+        if capacity > self._array.shape[0]:
+            self._reallocate(capacity)
 
-    def remove(self, ind):
-        if ind == None:
-            self._array = np.zeros((0, self.dim))
+    def shrink_to_fit(self):
+        if self._array.shape[0] > self._len:
+            self._own(self._array[:self._len].copy())
+
+    def remove(self, ind, in_place=False):
+        '''Remove vectors from the array.
+
+        If `in_place` is True, the remaining vectors are moved to the front of the
+        existing buffer instead of being copied to a new array. This avoids any
+        allocation, but modifies the array this `NumpyVectorArray` has been created
+        from in case it was created with `copy=False`. The capacity of the
+        array is not changed (compare `shrink_to_fit`).
+        '''
+        if ind is None:
+            if not in_place:
+                self._own(np.zeros((0, self.dim), dtype=self._array.dtype))
             self._len = 0
+            return
+        keep = np.ones(self._len, dtype=bool)
+        keep[ind] = False
+        if in_place:
+            removed = np.flatnonzero(~keep)
+            if len(removed) == 0:
+                return
+            self._prepare_write()
+            # move each block of remaining vectors between two removed ones to its new position
+            pos = int(removed[0])
+            for start, end in zip(removed + 1, np.append(removed[1:], self._len)):
+                if end > start:
+                    self._array[pos:pos + end - start] = self._array[start:end]
+                    pos += end - start
+            self._len = pos
         else:
-            self._array = self._array[list(x for x in xrange(len(self)) if x not in ind)]
-            self._len = self._array.shape[0]
-        if not self._array.flags['OWNDATA']:
-            self._array = self._array.copy()
+            self._own(self._array[:self._len][keep])
+            self._len = len(self._array)
 
     def replace(self, other, ind=None, o_ind=None, remove_from_other=False):
         assert self._compatible_shape(other, ind, o_ind)
+        _check_cast(other.dtype, self._array.dtype)
         if ind is None:
-            if o_ind is None:
-                self._array = other._array[:other._len]
-            else:
-                self._array = other._array[o_ind]
+            self._own(np.array(other._rows(o_ind), dtype=self._array.dtype))
             self._len = self._array.shape[0]
         else:
-            if o_ind is None:
-                self._array[ind] = other._array[:other._len]
-            else:
-                self._array[ind] = other._array[o_ind]
-        if not self._array.flags['OWNDATA']:
-            self._array = self._array.copy()
+            self._prepare_write()
+            self._array[self._index(ind)] = other._rows(o_ind)
         if remove_from_other:
-            if o_ind == None:
-                other._array = np.zeros((0, other.dim))
-                other._len = 0
-            else:
-                other._array = other._array[list(x for x in xrange(len(other)) if x not in o_ind)]
-                other._len = other._array.shape[0]
-            if not other._array.flags['OWNDATA']:
-                other._array = self._array.copy()
+            other.remove(o_ind)
 
     def almost_equal(self, other, ind=None, o_ind=None, rtol=None, atol=None):
         assert self._compatible_shape(other, ind, o_ind)
-        A = self._array[:self._len] if ind is None else self._array[ind]
-        B = other._array[:other._len] if o_ind is None else other._array[o_ind]
+        A = self._rows(ind)
+        B = other._rows(o_ind)
         R = np.all(float_cmp(A, B, rtol=rtol, atol=atol), axis=1).squeeze()
         if R.ndim == 0:
             R = R[np.newaxis, ...]
@@ -131,44 +226,123 @@ class NumpyVectorArray(VectorArray, Communicable):
         assert other is None or o_factor != 0
         if other is not None:
             assert self._compatible_shape(other, ind, o_ind)
-        # TODO Treat special cases more efficiently
+        A = self._rows(ind)
         if o_factor == 0:
-            A = self._array[:self._len] if ind is None else self._array[ind]
-            return NumpyVectorArray(A * factor, copy=False)
-        else:
-            A = self._array[:self._len] if ind is None else self._array[ind]
-            B = other._array[:other._len] if o_ind is None else other._array[o_ind]
+            return NumpyVectorArray(A.copy() if factor == 1 else A * factor, copy=False)
+        B = other._rows(o_ind)
+        if len(A) != len(B):
             return NumpyVectorArray(A * factor + B * o_factor, copy=False)
+        # allocate the result only once and add the second summand with axpy
+        dtype = np.result_type(A, B, factor, o_factor)
+        R = A.astype(dtype) if factor == 1 else np.multiply(A, factor, dtype=dtype)
+        _axpy(o_factor, B, R)
+        return NumpyVectorArray(R, copy=False)
 
     def iadd_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
         assert other is None or o_factor != 0
         if other is not None:
             assert self._compatible_shape(other, ind, o_ind)
-        # TODO Treat special cases more efficiently
+        index = self._index(ind)
         if o_factor == 0:
-            if ind is None:
-                self._array[:self._len] *= factor
-            else:
-                self._array[ind] *= factor
+            if factor != 1:
+                self._prepare_write()
+                self._array[index] *= factor
+            return self
+        B = other._rows(o_ind)
+        self._prepare_write()
+        if not isinstance(index, slice):
+            self._array[index] = self._array[index] * factor + B * o_factor
+            return self
+        A = self._array[index]
+        if factor != 1:
+            if np.may_share_memory(A, B):
+                # B is a view of self, so form the scaled summand before modifying self
+                B = B * o_factor
+                o_factor = 1
+            A *= factor
+        _axpy(o_factor, B, A)
+        return self
+
+    def axpy(self, alpha, x, ind=None, x_ind=None):
+        return self.iadd_mult(x, o_factor=alpha, ind=ind, o_ind=x_ind) if alpha != 0 else self
+
+    def iadd_lincomb(self, coefficients, other, ind=None, o_ind=None):
+        assert coefficients.ndim == 2
+        assert self.dim == other.dim
+        index = self._index(ind)
+        B = other._rows(o_ind)
+        assert coefficients.shape == (len(self) if ind is None else len(ind), len(B))
+        self._prepare_write()
+        if not isinstance(index, slice):
+            self._array[index] += coefficients.dot(B)
+            return self
+        A = self._array[index]
+        dtype = A.dtype
+        if (dtype.char in 'fdFD' and np.result_type(A, B, coefficients) == dtype and A.flags['C_CONTIGUOUS']
+                and len(A) > 0 and not np.may_share_memory(A, B)):
+            # A^T += B^T * coefficients^T on the Fortran-ordered transposes, updating A in place
+            gemm = _blas_funcs('gemm', dtype)
+            B = np.require(B, dtype=dtype, requirements='C')
+            coefficients = np.require(coefficients, dtype=dtype, requirements='C')
+            gemm(1., B.T, coefficients.T, beta=1., c=A.T, overwrite_c=True)
         else:
-            B = other._array[:other._len] if o_ind is None else other._array[o_ind]
-            if ind is None:
-                self._array[:self._len] *= factor
-                self._array[:self._len] += B * o_factor
-            else:
-                self._array[ind] *= factor
-                self._array[ind] += B * o_factor
+            A += coefficients.dot(B)
         return self
 
+    def _block_size(self):
+        return max(self._block_bytes // max(self.dim * self._array.dtype.itemsize, 1), 1)
+
     def prod(self, other, ind=None, o_ind=None, pairwise=True):
-        A = self._array[:self._len] if ind is None else self._array[ind]
-        B = other._array[:other._len] if o_ind is None else other._array[o_ind]
+        dtype = _product_dtype(self._array, other._array)
         if pairwise:
             assert self._compatible_shape(other, ind, o_ind, broadcast=False)
-            return np.sum(A * B, axis=1)
+            blocks = _paired_index_blocks(ind, self._len, o_ind, other._len, self._block_size())
+            R = [_row_dots(self._array[block], other._array[o_block], dtype) for block, o_block in blocks]
+            return np.concatenate(R) if R else np.empty(0, dtype=dtype)
         else:
             assert self.dim == other.dim
-            return A.dot(B.T)
+            R = np.empty((self._len if ind is None else len(ind), other._len if o_ind is None else len(o_ind)),
+                         dtype=dtype)
+            # only copy in blocks if indexing or type conversion requires copying, otherwise use a single
+            # BLAS call on views of the arrays
+            block_size = self._block_size()
+            index, o_index = self._index(ind), other._index(o_ind)
+            if isinstance(index, slice) and self._array.dtype == dtype and not np.iscomplexobj(self._array):
+                blocks = [index]
+            else:
+                blocks = _index_blocks(ind, self._len, block_size)
+            if isinstance(o_index, slice) and other._array.dtype == dtype:
+                o_blocks = [o_index]
+            else:
+                o_blocks = _index_blocks(o_ind, other._len, block_size)
+            pos = 0
+            for block in blocks:
+                A = self._array[block].astype(dtype, copy=False).conj()
+                o_pos = 0
+                for o_block in o_blocks:
+                    B = other._array[o_block].astype(dtype, copy=False)
+                    R[pos:pos + len(A), o_pos:o_pos + len(B)] = A.dot(B.T)
+                    o_pos += len(B)
+                pos += len(A)
+            return R
+
+    def gramian(self, ind=None):
+        # only compute the blocks on and above the diagonal
+        dtype = _product_dtype(self._array)
+        block_size = self._block_size()
+        blocks = _index_blocks(ind, self._len, block_size)
+        n = self._len if ind is None else len(ind)
+        R = np.empty((n, n), dtype=dtype)
+        positions = range(0, n, block_size) + [n]
+        for i, block in enumerate(blocks):
+            A = self._array[block].astype(dtype, copy=False)
+            for j in xrange(i, len(blocks)):
+                B = A if j == i else self._array[blocks[j]].astype(dtype, copy=False)
+                G = A.conj().dot(B.T)
+                R[positions[i]:positions[i + 1], positions[j]:positions[j + 1]] = G
+                if j != i:
+                    R[positions[j]:positions[j + 1], positions[i]:positions[i + 1]] = G.T.conj()
+        return R
 
     def lincomb(self, factors, ind=None):
         assert 1 <= factors.ndim <= 2
@@ -178,21 +352,150 @@ class NumpyVectorArray(VectorArray, Communicable):
             assert len(self) == factors.shape[1]
         else:
             assert len(ind) == factors.shape[1]
-        return NumpyVectorArray(factors.dot(self._array[:self._len]), copy=False)
+        return NumpyVectorArray(factors.dot(self._rows(ind)), copy=False)
 
     def lp_norm(self, p, ind=None):
-        A = self._array[:self._len] if ind is None else self._array[ind]
-        if p == 0.:
-            return np.max(np.abs(A), axis=1)
-        elif p == 1:
-            return np.sum(np.abs(A), axis=1)
-        elif p % 2 == 0:
-            return np.sum(np.power(A, p), axis=1)**(1/p)
-        else:
-            return np.sum(np.power(np.abs(A), p), axis=1)**(1/p)
+        dtype = _product_dtype(self._array)
+        real_dtype = np.zeros(0, dtype=dtype).real.dtype
+        R = []
+        for block in _index_blocks(ind, self._len, self._block_size()):
+            A = self._array[block]
+            if p == 2:
+                R.append(np.sqrt(_row_dots(A, A, dtype).real))
+            elif p == 0.:
+                R.append(np.max(np.abs(A), axis=1).astype(real_dtype, copy=False))
+            elif p == 1:
+                R.append(np.sum(np.abs(A), axis=1, dtype=real_dtype))
+            else:
+                A = np.abs(A.astype(dtype, copy=False))
+                R.append(np.sum(np.power(A, p), axis=1)**(1/p))
+        return np.concatenate(R) if R else np.empty(0, dtype=real_dtype)
 
     def __str__(self):
         return self._array[:self._len].__str__()
 
     def __repr__(self):
         return 'NumpyVectorArray({})'.format(self._array[:self._len].__str__())
+
+
+def _check_cast(dtype, array_dtype):
+    '''Raise a `TypeError` if vectors of `dtype` cannot be stored in an array of `array_dtype`.'''
+    if not np.can_cast(dtype, array_dtype, casting='same_kind'):
+        raise TypeError('Cannot store vectors of dtype {} in a VectorArray of dtype {}'.format(dtype, array_dtype))
+
+
+def _product_dtype(*arrays):
+    '''The dtype in which scalar products of the given arrays are computed.
+
+    See `defaults.vectorarray_product_dtype`.
+    '''
+    if defaults.vectorarray_product_dtype is None:
+        return np.result_type(*arrays)
+    return np.result_type(defaults.vectorarray_product_dtype, *arrays)
+
+
+def _promote_for_product(*arrays):
+    '''Convert arrays to at least the precision given by `defaults.vectorarray_product_dtype`.'''
+    dtype = _product_dtype(*arrays)
+    return tuple(A.astype(dtype, copy=False) for A in arrays)
+
+
+def _row_dots(A, B, dtype):
+    '''Scalar products of corresponding rows of `A` and `B` (one of which may have a single row), computed
+    in `dtype` without forming the full product array.'''
+    if np.iscomplexobj(A):
+        A = A.conj()
+    if len(A) != len(B):
+        A, B = np.broadcast_arrays(A, B)
+    return np.einsum('ij,ij->i', A, B, dtype=dtype)
+
+
+_blas_cache = {}
+
+
+def _blas_funcs(name, dtype):
+    try:
+        return _blas_cache[name, dtype]
+    except KeyError:
+        f = _blas_cache[name, dtype] = get_blas_funcs(name, dtype=dtype)
+        return f
+
+
+def _axpy(alpha, x, y):
+    '''Compute `y += alpha * x` in place for a view `y` of the vectors of a `NumpyVectorArray`.
+
+    BLAS `axpy` is used if `x` and `y` are contiguous arrays of the same shape and floating
+    point dtype which do not overlap, otherwise `x` is broadcast to the shape of `y`.
+    '''
+    dtype = y.dtype
+    if (x.shape == y.shape and x.dtype == dtype and dtype.char in 'fdFD' and y.size > 0
+            and x.flags['C_CONTIGUOUS'] and y.flags['C_CONTIGUOUS'] and not np.may_share_memory(x, y)
+            and np.result_type(dtype, alpha) == dtype):
+        _blas_funcs('axpy', dtype)(x.reshape(-1), y.reshape(-1), a=alpha)
+    elif alpha == 1:
+        y += x
+    else:
+        y += x * alpha
+
+
+def _normalize_index(ind, length):
+    '''Convert an index set of a `VectorArray` of length `length` to something numpy can index with.
+
+    None and index sets forming a range with positive step are converted to slices, so that
+    indexing with them yields views. All other index sets are converted to an array of indices.
+    '''
+    if ind is None:
+        return slice(0, length)
+    if isinstance(ind, slice):
+        return ind
+    if isinstance(ind, Number):
+        ind = [ind]
+    n = len(ind)
+    if n == 0:
+        return slice(0, 0)
+    if n == 1:
+        i = int(ind[0])
+        i = i + length if i < 0 else i
+        if 0 <= i < length:
+            return slice(i, i + 1)
+        return np.array([i], dtype=np.intp)    # let numpy raise the IndexError
+    if isinstance(ind, xrange):
+        start, step = ind[0], ind[1] - ind[0]
+        if start >= 0 and step > 0:
+            return slice(start, ind[-1] + 1, step)
+        return np.array(ind, dtype=np.intp)
+    ind = np.asarray(ind, dtype=np.intp).ravel()
+    start, step = ind[0], ind[1] - ind[0]
+    if start >= 0 and step > 0 and np.all(np.diff(ind) == step):
+        return slice(int(start), int(ind[-1]) + 1, int(step))
+    return ind
+
+
+def _index_blocks(ind, length, block_size):
+    '''Split the index set `ind` into blocks of at most `block_size` indices.
+
+    Index sets which can be represented by slices (see `_normalize_index`) are split into
+    slices, so that indexing with the blocks does not copy.
+    '''
+    ind = _normalize_index(ind, length)
+    if isinstance(ind, slice):
+        start, stop, step = ind.indices(length)
+        n = len(xrange(start, stop, step))
+        return [slice(start + i * step, start + (min(i + block_size, n) - 1) * step + 1, step)
+                for i in xrange(0, n, block_size)]
+    return [ind[i:i + block_size] for i in xrange(0, len(ind), block_size)]
+
+
+def _paired_index_blocks(ind, length, o_ind, o_length, block_size):
+    '''Blocks of corresponding indices of two arrays, where a single index is paired with all indices.'''
+    len_self = length if ind is None else len(ind)
+    len_other = o_length if o_ind is None else len(o_ind)
+    if len_self == len_other:
+        return zip(_index_blocks(ind, length, block_size), _index_blocks(o_ind, o_length, block_size))
+    elif len_other == 1:
+        o_block = _normalize_index(0 if o_ind is None else o_ind, o_length)
+        return [(block, o_block) for block in _index_blocks(ind, length, block_size)]
+    else:
+        assert len_self == 1
+        block = _normalize_index(0 if ind is None else ind, length)
+        return [(block, o_block) for o_block in _index_blocks(o_ind, o_length, block_size)]
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+# This file is part of the pyMor project (http://www.pymor.org).
+# Copyright Holders: Felix Albrecht, Rene Milk, Stephan Rave
+# License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
+
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+import scipy.sparse as sps
+
+from pymor.core import defaults
+from pymor.la.interfaces import VectorArray, Communicable
+from pymor.la.numpyvectorarray import NumpyVectorArray, _normalize_index, _product_dtype
+from pymor.tools import float_cmp
+
+
+class SparseVectorArray(VectorArray, Communicable):
+    '''`VectorArray` implementation storing the vectors as the rows of a `scipy.sparse.csr_matrix`.
+
+    Memory consumption and the costs of `prod`, `add_mult`, `lincomb` and `lp_norm`
+    scale with the number of nonzero entries instead of the dimension of the vectors.
+    This pays off for vectors which are supported on a small subset of the DOFs, e.g.
+    localized right hand sides.
+
+    `add_mult` and `lincomb` return a `NumpyVectorArray` instead of a `SparseVectorArray`
+    if the fraction of nonzero entries of the result exceeds `densify_threshold`, or
+    if `other` is a `NumpyVectorArray`. In-place operations always keep the vectors sparse.
+
+    Parameters
+    ----------
+    object
+        A `scipy.sparse` matrix, a `numpy.ndarray` or a `Communicable` whose rows are
+        the vectors.
+    dtype
+        If not None, the vectors are converted to this dtype.
+    copy
+        If True, the data of `object` is always copied.
+    '''
+
+    densify_threshold = 0.25
+
+    @classmethod
+    def empty(cls, dim, reserve=0, dtype=None):
+        return cls(sps.csr_matrix((0, dim), dtype=np.float64 if dtype is None else dtype))
+
+    def __init__(self, object, dtype=None, copy=False):
+        if isinstance(object, Communicable):
+            object = object.data
+        if sps.issparse(object):
+            matrix = object.tocsr(copy=copy)
+        else:
+            matrix = sps.csr_matrix(np.array(object, ndmin=2, copy=False))
+        if dtype is not None and matrix.dtype != dtype:
+            matrix = matrix.astype(dtype)
+        self._matrix = matrix
+
+    def _data(self):
+        return self._matrix.toarray()
+
+    def _rows(self, ind):
+        index = _normalize_index(ind, self._matrix.shape[0])
+        if isinstance(index, slice) and index == slice(0, self._matrix.shape[0]):
+            return self._matrix
+        return self._matrix[index]
+
+    def _wrap(self, matrix):
+        if matrix.nnz > self.densify_threshold * matrix.shape[0] * matrix.shape[1]:
+            return NumpyVectorArray(matrix.toarray(), copy=False)
+        return SparseVectorArray(matrix)
+
+    def __len__(self):
+        return self._matrix.shape[0]
+
+    @property
+    def dim(self):
+        return self._matrix.shape[1]
+
+    @property
+    def dtype(self):
+        return self._matrix.dtype
+
+    @property
+    def nnz(self):
+        '''The number of stored entries of all vectors.'''
+        return self._matrix.nnz
+
+    def copy(self, ind=None, deep=True):
+        return SparseVectorArray(self._rows(ind), copy=True)
+
+    def append(self, other, o_ind=None, remove_from_other=False):
+        assert self.dim == other.dim
+        self._matrix = sps.vstack([self._matrix, _sparse_rows(other, o_ind)], format='csr')
+        if remove_from_other:
+            other.remove(o_ind)
+
+    def remove(self, ind):
+        if ind is None:
+            self._matrix = sps.csr_matrix((0, self.dim), dtype=self.dtype)
+            return
+        keep = np.ones(len(self), dtype=bool)
+        keep[ind] = False
+        self._matrix = self._matrix[np.flatnonzero(keep)]
+
+    def replace(self, other, ind=None, o_ind=None, remove_from_other=False):
+        assert self._compatible_shape(other, ind, o_ind)
+        R = _sparse_rows(other, o_ind)
+        if ind is None:
+            self._matrix = R.copy() if R is self._matrix else R
+        else:
+            # select the rows of the new array from the stacked old and new vectors
+            n = len(self)
+            order = np.arange(n)
+            order[ind] = n + np.arange(R.shape[0]) if R.shape[0] > 1 else n
+            self._matrix = sps.vstack([self._matrix, R], format='csr')[order]
+        if remove_from_other:
+            other.remove(o_ind)
+
+    def almost_equal(self, other, ind=None, o_ind=None, rtol=None, atol=None):
+        assert self._compatible_shape(other, ind, o_ind)
+        A, B = _broadcast_rows(self._rows(ind), _rows(other, o_ind))
+        if not sps.issparse(B):
+            return np.all(float_cmp(A.toarray(), B, rtol=rtol, atol=atol), axis=1)
+        rtol = rtol or defaults.float_cmp_tol
+        atol = atol or rtol
+        # |a - b| - rtol * |b| vanishes outside the union of the sparsity patterns of A and B
+        V = abs(A - B) - abs(B) * rtol
+        return V.max(axis=1).toarray().ravel() <= atol
+
+    def add_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        A = self._rows(ind)
+        if o_factor == 0:
+            return SparseVectorArray(A * factor)
+        assert self._compatible_shape(other, ind, o_ind)
+        A, B = _broadcast_rows(A, _rows(other, o_ind))
+        if not sps.issparse(B):
+            return NumpyVectorArray(A.toarray() * factor + B * o_factor, copy=False)
+        return self._wrap(A * factor + B * o_factor)
+
+    def iadd_mult(self, other, factor=1., o_factor=1., ind=None, o_ind=None):
+        assert other is None or o_factor != 0
+        if o_factor == 0:
+            if ind is None:
+                self._matrix = self._matrix * factor
+            else:
+                self.replace(SparseVectorArray(self._rows(ind) * factor), ind=ind)
+            return self
+        assert self._compatible_shape(other, ind, o_ind)
+        A, B = _broadcast_rows(self._rows(ind), _rows(other, o_ind))
+        R = sps.csr_matrix(A * factor + B * o_factor)
+        if ind is None:
+            self._matrix = R
+        else:
+            self.replace(SparseVectorArray(R), ind=ind)
+        return self
+
+    def prod(self, other, ind=None, o_ind=None, pairwise=True):
+        assert self.dim == other.dim
+        B = _rows(other, o_ind)
+        dtype = _product_dtype(np.empty(0, dtype=self.dtype), np.empty(0, dtype=B.dtype))
+        A = self._rows(ind).astype(dtype).conj()
+        if pairwise:
+            assert self._compatible_shape(other, ind, o_ind, broadcast=False)
+            A, B = _broadcast_rows(A, B)
+            return np.asarray(A.multiply(B).sum(axis=1), dtype=dtype).ravel()
+        else:
+            R = A.dot(B.T)
+            return R.toarray() if sps.issparse(R) else np.asarray(R, dtype=dtype)
+
+    def lincomb(self, factors, ind=None):
+        assert 1 <= factors.ndim <= 2
+        if factors.ndim == 1:
+            factors = factors[np.newaxis, ...]
+        A = self._rows(ind)
+        assert A.shape[0] == factors.shape[1]
+        return self._wrap(sps.csr_matrix(factors).dot(A))
+
+    def lp_norm(self, p, ind=None):
+        dtype = _product_dtype(np.empty(0, dtype=self.dtype))
+        A = abs(self._rows(ind).astype(dtype))
+        if A.shape[1] == 0:
+            return np.zeros(A.shape[0])
+        if p == 0:
+            return A.max(axis=1).toarray().ravel()
+        return np.asarray(A.power(p).sum(axis=1)).ravel() ** (1 / p)
+
+    def __str__(self):
+        return 'SparseVectorArray of {} vectors of dimension {} with {} nonzeros'.format(len(self), self.dim,
+                                                                                        self.nnz)
+
+    def __repr__(self):
+        return 'SparseVectorArray({})'.format(self._matrix.__repr__())
+
+
+def _rows(U, ind):
+    '''The vectors with indices `ind` of a `SparseVectorArray` or `NumpyVectorArray`.'''
+    assert isinstance(U, (SparseVectorArray, NumpyVectorArray))
+    return U._rows(ind)
+
+
+def _sparse_rows(U, ind):
+    R = _rows(U, ind)
+    return R if sps.issparse(R) else sps.csr_matrix(R)
+
+
+def _broadcast_rows(A, B):
+    '''Repeat a single row of `A` or `B` to match the number of rows of the other.'''
+    if A.shape[0] == 1 and B.shape[0] != 1:
+        A = A[np.zeros(B.shape[0], dtype=np.intp)] if sps.issparse(A) else np.repeat(A, B.shape[0], axis=0)
+    elif B.shape[0] == 1 and A.shape[0] != 1:
+        B = B[np.zeros(A.shape[0], dtype=np.intp)] if sps.issparse(B) else np.repeat(B, A.shape[0], axis=0)
+    return A, B
@@ -66,22 +66,30 @@ class NumpyLinearOperator(LinearOperatorInterface):
     ----------
     matrix
         The Matrix which is to be wrapped.
+    dtype
+        If not None, the matrix is converted to this dtype.
     name
         Name of the operator.
     '''
 
     type_source = type_range = NumpyVectorArray
 
-    def __init__(self, matrix, name=None):
+    def __init__(self, matrix, dtype=None, name=None):
         super(NumpyLinearOperator, self).__init__()
         assert matrix.ndim <= 2
         if matrix.ndim == 1:
             matrix = np.reshape(matrix, (1, -1))
+        if dtype is not None and matrix.dtype != dtype:
+            matrix = matrix.astype(dtype)
         self.dim_source = matrix.shape[1]
         self.dim_range = matrix.shape[0]
         self.name = name
         self._matrix = matrix
 
+    @property
+    def dtype(self):
+        return self._matrix.dtype
+
     def as_vector_array(self):
         return NumpyVectorArray(self._matrix, copy=True)
 
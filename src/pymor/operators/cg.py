@@ -5,6 +5,8 @@
 
 from __future__ import absolute_import, division, print_function
 
+from functools import wraps
+
 import numpy as np
 from scipy.sparse import coo_matrix, csr_matrix
 
@@ -14,6 +16,15 @@ from pymor.operators.interfaces import LinearOperatorInterface
 from pymor.operators.basic import NumpyLinearOperator
 
 
+def _pin_grid_data(assemble):
+    '''Keep the grid data accessed during the assembly from being evicted while assembling.'''
+    @wraps(assemble)
+    def wrapper(self, mu=None):
+        with self.grid.pinned_cached_data():
+            return assemble(self, mu)
+    return wrapper
+
+
 class L2ProductFunctionalP1(LinearOperatorInterface):
     '''Scalar product with an L2-function for linear finite elements.
 
@@ -36,13 +47,16 @@ class L2ProductFunctionalP1(LinearOperatorInterface):
     dirichlet_data
         The `Function` providing the Dirichlet boundary values. If None, zero boundary
         is assumed.
+    dtype
+        If not None, the assembled matrix is converted to this dtype. The assembly
+        itself is always carried out in double precision.
     name
         The name of the functional.
     '''
 
     type_source = type_range = NumpyVectorArray
 
-    def __init__(self, grid, function, boundary_info=None, dirichlet_data=None, name=None):
+    def __init__(self, grid, function, boundary_info=None, dirichlet_data=None, dtype=None, name=None):
         assert grid.reference_element(0) in {line, triangle}
         assert function.dim_range == 1
         super(L2ProductFunctionalP1, self).__init__()
@@ -52,9 +66,11 @@ class L2ProductFunctionalP1(LinearOperatorInterface):
         self.boundary_info = boundary_info
         self.function = function
         self.dirichlet_data = dirichlet_data
+        self.dtype = dtype
         self.name = name
         self.build_parameter_type(inherits={'function': function, 'dirichlet_data': dirichlet_data})
 
+    @_pin_grid_data
     def _assemble(self, mu=None):
         g = self.grid
         bi = self.boundary_info
@@ -92,7 +108,7 @@ class L2ProductFunctionalP1(LinearOperatorInterface):
             else:
                 I[DI] = 0
 
-        return NumpyLinearOperator(I.reshape((1, -1)))
+        return NumpyLinearOperator(I.reshape((1, -1)), dtype=self.dtype)
 
 
 class L2ProductP1(LinearOperatorInterface):
@@ -107,20 +123,25 @@ class L2ProductP1(LinearOperatorInterface):
     ----------
     grid
         The grid on which to assemble the product.
+    dtype
+        If not None, the assembled matrix is converted to this dtype. The assembly
+        itself is always carried out in double precision.
     name
         The name of the product.
     '''
 
     type_source = type_range = NumpyVectorArray
 
-    def __init__(self, grid, name=None):
+    def __init__(self, grid, dtype=None, name=None):
         assert grid.reference_element in (line, triangle)
         super(L2ProductP1, self).__init__()
         self.dim_source = grid.size(grid.dim)
         self.dim_range = self.dim_source
         self.grid = grid
+        self.dtype = dtype
         self.name = name
 
+    @_pin_grid_data
     def _assemble(self, mu=None):
         assert mu is None
         g = self.grid
@@ -153,7 +174,7 @@ class L2ProductP1(LinearOperatorInterface):
         A = coo_matrix((SF_INTS, (SF_I0, SF_I1)), shape=(g.size(g.dim), g.size(g.dim)))
         A = csr_matrix(A).copy()   # See DiffusionOperatorP1 for why copy() is necessary
 
-        return NumpyLinearOperator(A)
+        return NumpyLinearOperator(A, dtype=self.dtype)
 
 
 class DiffusionOperatorP1(LinearOperatorInterface):
@@ -183,6 +204,9 @@ class DiffusionOperatorP1(LinearOperatorInterface):
     dirichlet_clear_diag
         If True, also set diagonal entries corresponding to Dirichlet boundary DOFs to
         zero (e.g. for affine decomposition).
+    dtype
+        If not None, the assembled matrix is converted to this dtype. The assembly
+        itself is always carried out in double precision.
     name
         Name of the operator.
     '''
@@ -190,7 +214,7 @@ class DiffusionOperatorP1(LinearOperatorInterface):
     type_source = type_range = NumpyVectorArray
 
     def __init__(self, grid, boundary_info, diffusion_function=None, diffusion_constant=None,
-                 dirichlet_clear_columns=False, dirichlet_clear_diag=False, name=None):
+                 dirichlet_clear_columns=False, dirichlet_clear_diag=False, dtype=None, name=None):
         assert grid.reference_element(0) in {triangle, line}, ValueError('A simplicial grid is expected!')
         super(DiffusionOperatorP1, self).__init__()
         self.dim_source = self.dim_range = grid.size(grid.dim)
@@ -200,10 +224,12 @@ class DiffusionOperatorP1(LinearOperatorInterface):
         self.diffusion_function = diffusion_function
         self.dirichlet_clear_columns = dirichlet_clear_columns
         self.dirichlet_clear_diag = dirichlet_clear_diag
+        self.dtype = dtype
         self.name = name
         if diffusion_function is not None:
             self.build_parameter_type(inherits={'diffusion': diffusion_function})
 
+    @_pin_grid_data
     def _assemble(self, mu=None):
         mu = self.parse_parameter(mu)
         g = self.grid
@@ -261,4 +287,4 @@ class DiffusionOperatorP1(LinearOperatorInterface):
         # from pymor.tools.memory import print_memory_usage
         # print_memory_usage('matrix: {0:5.1f}'.format((A.data.nbytes + A.indptr.nbytes + A.indices.nbytes)/1024**2))
 
-        return NumpyLinearOperator(A)
+        return NumpyLinearOperator(A, dtype=self.dtype)
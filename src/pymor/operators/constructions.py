@@ -67,7 +67,7 @@ class ProjectedOperator(OperatorInterface):
         self.product = product
 
     def apply(self, U, ind=None, mu=None):
-        U_array = U._array if ind is None else U._array[ind]
+        U_array = U._array[:U._len] if ind is None else U._array[ind]
         V = self.source_basis.lincomb(U_array)
         if self.product is None:
             return NumpyVectorArray(self.operator.apply2(self.range_basis, V, mu=self.map_parameter(mu)).T)
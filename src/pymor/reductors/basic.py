@@ -19,7 +19,7 @@ class GenericRBReconstructor(core.BasicInterface):
 
     def reconstruct(self, U):
         assert isinstance(U, NumpyVectorArray)
-        return self.RB.lincomb(U._array)
+        return self.RB.lincomb(U._array[:U._len])
 
 
 def reduce_generic_rb(discretization, RB, product=None, disable_caching=True):
@@ -3,10 +3,16 @@
 # License: BSD 2-Clause License (http://opensource.org/licenses/BSD-2-Clause)
 
 from __future__ import absolute_import, division, print_function
+import os
 import time
+import shutil
 from datetime import datetime
+from tempfile import mkdtemp
 
-from pymor.core import cache
+import numpy as np
+
+from pymor.core import cache, dumps
+from pymor.la import NumpyVectorArray
 from pymortests.base import TestBase, runmodule
 
 SLEEP_SECONDS = 0.2
@@ -79,7 +85,8 @@ class CacheTest(TestBase):
         self.assertNotEqual(x_id, y_id)
 
     def test_backend_api(self):
-        for backend_cls in [cache.LimitedFileBackend, cache.LimitedMemoryBackend, cache.DummyBackend]:
+        for backend_cls in [cache.LimitedFileBackend, cache.LimitedMemoryBackend, cache.SharedMemoryBackend,
+                            cache.DummyBackend]:
             backend = backend_cls({})
             self.assertEqual(backend.get('mykey'), cache.NO_VALUE)
             backend.set('mykey', 1)
@@ -87,6 +94,274 @@ class CacheTest(TestBase):
             backend.delete('mykey')
             self.assertEqual(backend.get('mykey'), cache.NO_VALUE)
 
+    def test_memory_lru(self):
+        backend = cache.LimitedMemoryBackend({'max_kbytes': 16})
+        for i in range(4):
+            backend.set(i, np.zeros(512))
+        self.assertEqual(backend._current_bytes, 4 * 4096)
+        backend.get(0)
+        backend.set(4, np.zeros(512))
+        self.assertIs(backend.get(1), cache.NO_VALUE)
+        self.assertIsNot(backend.get(0), cache.NO_VALUE)
+        self.assertEqual(backend._current_bytes, 16 * 1024)
+        backend.set(5, NumpyVectorArray(np.zeros((2, 1024))))
+        self.assertEqual(backend._cache.keys(), [5])
+        self.assertEqual(backend._current_bytes, 16 * 1024)
+
+    def test_memory_pinning(self):
+        backend = cache.LimitedMemoryBackend({'max_kbytes': 8})
+        backend.set(0, np.zeros(512))
+        backend.pin(0)
+        for i in range(1, 4):
+            backend.set(i, np.zeros(512))
+        self.assertEqual(backend.sizes().keys(), [0, 3])
+        backend.pin(3)
+        backend.set(4, np.zeros(512))
+        self.assertEqual(backend.sizes().keys(), [0, 3, 4])
+        backend.unpin(3)
+        self.assertEqual(backend.sizes().keys(), [0, 4])
+        backend.clear()
+        self.assertEqual(backend.sizes().keys(), [0])
+        backend = cache.LimitedMemoryBackend({'max_keys': 2})
+        for i in range(2):
+            backend.set(i, i)
+        backend.pin(0)
+        backend.unpin(0)
+        self.assertEqual(backend.sizes().keys(), [0, 1])
+
+    def test_grid_data(self):
+        from pymor.grids.rect import RectGrid
+        g = RectGrid()
+        with g.pinned_cached_data():
+            g.volumes(0)
+            self.assertEqual(g.resident_cached_data()['_volumes(0,)'][1], True)
+        g.centers(0)
+        resident = g.resident_cached_data()
+        self.assertEqual(sorted(resident.keys()), ['_centers(0,)', '_integration_elements(0,)', '_volumes(0,)'])
+        self.assertFalse(any(pinned for _, pinned in resident.itervalues()))
+        g.release_cached_data()
+        self.assertEqual(g.resident_cached_data(), {})
+
+    def test_keygen(self):
+        from pymor.parameters import Parameter
+        mu = Parameter({'diffusion': (10, 10)}, diffusion=np.ones((10, 10)))
+        nu = mu.copy()
+        nu['diffusion'][3, 3] += 1e-12
+        function = IamMemoryCached.__dict__['me_takey_long_time'].decorated_function
+        keygen = IamMemoryCached().keygen_generator('ns', function)
+        self.assertEqual(keygen(mu), keygen(mu.copy()))
+        self.assertNotEqual(keygen(mu), keygen(nu))
+        self.assertNotEqual(keygen(mu), keygen(mu=mu))
+        self.assertEqual(len(keygen(mu)), len(keygen(nu, 'other', x=3)))
+        self.assertEqual(cache.hash_args((mu,), quantization=1e-6), cache.hash_args((nu,), quantization=1e-6))
+
+    def test_shared_memory(self):
+        from multiprocessing import Process
+        path = mkdtemp()
+        try:
+            config = {'path': path}
+            p = Process(target=_set_shared, args=(config, 'U', NumpyVectorArray(np.arange(6.).reshape((2, 3)))))
+            p.start()
+            p.join()
+            U = cache.SharedMemoryBackend(config).get('U')
+            self.assertIsInstance(U, NumpyVectorArray)
+            self.assertTrue(np.all(U.data == np.arange(6.).reshape((2, 3))))
+            backend = cache.SharedMemoryBackend(dict(config, max_kbytes=3))
+            for i in range(5):
+                backend.set(str(i), np.ones(128) * i)
+            self.assertLessEqual(backend.nbytes, 3 * 1024)
+            self.assertIs(backend.get('0'), cache.NO_VALUE)
+            self.assertTrue(np.all(backend.get('4') == 4))
+            backend.set('large', np.ones(1024))
+            self.assertIs(backend.get('large'), cache.NO_VALUE)
+            self.assertTrue(np.all(backend.get('3') == 3))
+            backend.delete('4')
+            self.assertEqual(backend.nbytes, sum(os.path.getsize(os.path.join(path, fn))
+                                                 for fn in os.listdir(path) if fn.endswith('.npy')))
+        finally:
+            shutil.rmtree(path)
+
+    def test_file_log(self):
+        path = mkdtemp()
+        try:
+            config = {'filename': os.path.join(path, 'cache'), 'max_keys': 5, 'min_compaction_kbytes': 1}
+            backend = cache.LimitedFileBackend(config)
+            for i in range(20):
+                backend.set(i, NumpyVectorArray(np.ones((2, 100)) * i))
+            backend.set('x', 'some string')
+            self.assertEqual(list(backend._index.keys()), [16, 17, 18, 19, 'x'])
+            self.assertGreater(backend._generation, 0)
+            restarted = cache.LimitedFileBackend(config)
+            self.assertEqual(list(restarted._index.keys()), [16, 17, 18, 19, 'x'])
+            self.assertTrue(np.all(restarted.get(19).data == 19))
+            self.assertEqual(restarted.get('x'), 'some string')
+            self.assertIs(restarted.get(15), cache.NO_VALUE)
+            restarted.delete(19)
+            restarted.compact()
+            self.assertIs(backend.get(19), cache.NO_VALUE)
+            self.assertTrue(np.all(backend.get(18).data == 18))
+        finally:
+            shutil.rmtree(path)
+
+    def test_file_torn_record(self):
+        path = mkdtemp()
+        try:
+            config = {'filename': os.path.join(path, 'cache')}
+            backend = cache.LimitedFileBackend(config)
+            backend.set(0, np.zeros(10))
+            with open(backend._index_fn, 'ab') as f:
+                f.write(dumps(('s', 2, 0, 1000, 100, '<f8', (10,), False, None))[:-5])
+            restarted = cache.LimitedFileBackend(config)
+            restarted.set(1, np.ones(10))
+            self.assertEqual(list(cache.LimitedFileBackend(config)._index.keys()), [0, 1])
+            self.assertTrue(np.all(backend.get(1) == 1))
+        finally:
+            shutil.rmtree(path)
+
+    def test_write_behind(self):
+        path = mkdtemp()
+        try:
+            config = {'filename': os.path.join(path, 'cache'), 'write_behind': True, 'write_queue_size': 2}
+            backend = cache.LimitedFileBackend(config)
+            for i in range(10):
+                backend.set(i, np.ones(100) * i)
+            backend.delete(3)
+            self.assertTrue(np.all(backend.get(9) == 9))
+            self.assertIs(backend.get(3), cache.NO_VALUE)
+            backend.flush()
+            self.assertEqual(backend._pending, {})
+            restarted = cache.LimitedFileBackend({'filename': config['filename']})
+            self.assertEqual(list(restarted._index.keys()), [0, 1, 2, 4, 5, 6, 7, 8, 9])
+            backend.set(10, np.ones(100) * 10)
+            backend.stop_writer()
+            self.assertFalse(backend._writer.is_alive())
+            backend.set(11, np.ones(100) * 11)
+            self.assertEqual(list(cache.LimitedFileBackend({'filename': config['filename']})._index.keys())[-2:],
+                             [10, 11])
+        finally:
+            shutil.rmtree(path)
+
+    def test_tiered(self):
+        path = mkdtemp()
+        try:
+            backend = cache.TieredBackend({'memory': {'max_keys': 2},
+                                           'disk': {'filename': os.path.join(path, 'cache')}})
+            for i in range(3):
+                backend.set(i, np.ones(10) * i)
+            self.assertEqual(backend.tier_statistics['disk']['demotions'], 1)
+            self.assertTrue(np.all(backend.get(0) == 0))
+            self.assertTrue(np.all(backend.get(2) == 2))
+            self.assertIs(backend.get(3), cache.NO_VALUE)
+            stats = backend.tier_statistics
+            self.assertEqual(stats['memory'].pop('bytes'), backend._memory.nbytes)
+            self.assertEqual(stats['disk'].pop('bytes'), backend._disk.nbytes)
+            self.assertEqual(stats['memory'], {'hits': 1, 'misses': 2, 'promotions': 1, 'demotions': 0})
+            self.assertEqual(stats['disk'], {'hits': 1, 'misses': 1, 'promotions': 0, 'demotions': 2})
+            self.assertEqual(backend.nbytes, backend._memory.nbytes + backend._disk.entry_bytes([1]))
+            self.assertEqual(sorted(backend._disk.keys()), [0, 1])
+            self.assertTrue(backend._disk.contains(1))
+            self.assertFalse(backend._disk.contains(2))
+            backend.set(0, np.ones(10) * 5)
+            self.assertFalse(backend._disk.contains(0))
+            backend.set(10, np.ones(10))
+            backend.set(11, np.ones(10))
+            self.assertTrue(np.all(backend._disk.get(0) == 5))
+        finally:
+            shutil.rmtree(path)
+
+    def test_statistics(self):
+        c = IamMemoryCached()
+        for val in ['koko', 'koko', 'other', 'koko']:
+            c.me_takey_long_time(val)
+        stats = c.cache_statistics()
+        self.assertEqual(stats['backend']['hits'], 2)
+        self.assertEqual(stats['backend']['misses'], 2)
+        self.assertEqual(stats['backend']['sets'], 2)
+        self.assertGreater(stats['backend']['bytes'], 0)
+        method_stats = stats['methods']['me_takey_long_time']
+        self.assertEqual((method_stats['hits'], method_stats['misses']), (2, 2))
+        self.assertGreaterEqual(stats['time_saved'], 2 * SLEEP_SECONDS)
+        self.assertIn('me_takey_long_time: 2 hits, 2 misses', cache.cache_report())
+        self.assertFalse(hasattr(c, '_creation_times'))
+        self.assertGreaterEqual(c.cache_region.backend.recent_hits().values()[0]['creation_time'], SLEEP_SECONDS)
+
+    def test_fingerprint(self):
+        def make(c):
+            o = IWillBeCopied()
+            o.f = lambda x: x * c
+            o.a = np.arange(3.)
+            o.me = o
+            return o
+        x, y, z = make(1), make(1), make(2)
+        self.assertEqual(cache.fingerprint(x), cache.fingerprint(y))
+        self.assertNotEqual(cache.fingerprint(x), cache.fingerprint(z))
+        self.assertNotEqual(x.namespace, y.namespace)
+        x.fingerprint_tag = y.fingerprint_tag = 'v1'
+        x.a[0] = 1
+        self.assertEqual(cache.fingerprint(x), cache.fingerprint(y))
+
+        class Tagged(IWillBeCopied):
+            fingerprint_tag = 'v1'
+        u, v = Tagged(), Tagged()
+        u.a, v.a = np.arange(3.), np.arange(4.)
+        self.assertNotEqual(cache.fingerprint(u), cache.fingerprint(v))
+
+    def test_solve_many(self):
+        from pymor.operators import NumpyLinearOperator
+        from pymor.operators.affine import LinearAffinelyDecomposedOperator
+        from pymor.discretizations import StationaryLinearDiscretization
+        from pymor.parameters.functionals import ProjectionParameterFunctional
+        operator = LinearAffinelyDecomposedOperator([NumpyLinearOperator(np.eye(3))],
+                                                    operator_affine_part=NumpyLinearOperator(np.eye(3)),
+                                                    functionals=[ProjectionParameterFunctional({'k': tuple()}, 'k')])
+        d = StationaryLinearDiscretization(operator, NumpyLinearOperator(np.ones((1, 3))))
+        cache.Cachable.__init__(d, config=cache.DEFAULT_MEMORY_CONFIG)
+        d.solve({'k': 1.})
+        U = d.solve_many([{'k': k} for k in (0., 1., 3., 0.)])
+        self.assertTrue(np.allclose(U.data, 1. / np.array([[1.], [2.], [4.], [1.]])))
+        method_stats = d.cache_statistics()['methods']['solve']
+        self.assertEqual((method_stats['hits'], method_stats['misses']), (2, 3))
+        self.assertEqual(d.cache_statistics()['backend']['sets'], 3)
+
+        class ScaledDiscretization(StationaryLinearDiscretization):
+            def solve(self, mu=None):
+                return super(ScaledDiscretization, self).solve(mu) * 2.
+        d = ScaledDiscretization(operator, NumpyLinearOperator(np.ones((1, 3))))
+        cache.Cachable.__init__(d, config=cache.DEFAULT_MEMORY_CONFIG)
+        self.assertTrue(np.allclose(d.solve_many([{'k': 1.}, {'k': 3.}]).data, np.array([[1.], [0.5]])))
+
+        class CachedScaledDiscretization(StationaryLinearDiscretization):
+            @cache.cached
+            def solve(self, mu=None):
+                return self._solve(mu) * 2.
+        d = CachedScaledDiscretization(operator, NumpyLinearOperator(np.ones((1, 3))))
+        cache.Cachable.__init__(d, config=cache.DEFAULT_MEMORY_CONFIG)
+        self.assertTrue(np.allclose(d.solve_many([{'k': 1.}]).data, 1.))
+        self.assertTrue(np.allclose(d.solve({'k': 1.}).data, 1.))
+
+    def test_discretization_namespace(self):
+        from pymor.operators import NumpyLinearOperator
+        from pymor.discretizations import StationaryLinearDiscretization
+
+        def make():
+            return StationaryLinearDiscretization(NumpyLinearOperator(np.eye(3)), NumpyLinearOperator(np.ones((1, 3))))
+        d = make()
+        namespace = d.namespace
+        self.assertEqual(make().namespace, namespace)
+        c = d.copy()
+        self.assertEqual(c.namespace, namespace)
+        c.operators['rhs'] = NumpyLinearOperator(np.zeros((1, 3)))
+        self.assertNotEqual(c.namespace, namespace)
+        d.solver = lambda A, RHS: None
+        self.assertNotEqual(d.namespace, namespace)
+        e = make()
+        e.build_parameter_type({'k': tuple()}, local_global=True)
+        self.assertNotEqual(e.namespace, namespace)
+
+
+def _set_shared(config, key, value):
+    cache.SharedMemoryBackend(config).set(key, value)
+
 
 if __name__ == "__main__":
     runmodule(name='pymortests.core.cache')
@@ -8,6 +8,7 @@ import numpy as np
 from mock import Mock
 
 from pymor import la
+from pymor.core import pickle
 from pymor import discretizations
 from pymor.operators.cg import L2ProductP1
 from pymortests.base import TestBase, runmodule
@@ -26,5 +27,317 @@ class TestBasicParameterspace(TestBase):
         self.assertAlmostEqual(value, 0.0)
 
 
+class TestNumpyVectorArray(TestBase):
+
+    def test_append_growth(self):
+        U = la.NumpyVectorArray.empty(3)
+        for i in range(10):
+            U.append(la.NumpyVectorArray(np.ones(3) * i))
+        self.assertEqual(len(U), 10)
+        self.assertEqual(U._array.shape[0], 16)
+        self.assertTrue(np.all(U.data == np.arange(10)[:, np.newaxis]))
+        U.append(la.NumpyVectorArray(np.ones((2, 3), dtype=np.float32) * 0.5))
+        self.assertEqual(U.data.dtype, np.float64)
+        U.shrink_to_fit()
+        self.assertEqual(U._array.shape[0], 12)
+        U.reserve(20)
+        self.assertEqual(U._array.shape[0], 20)
+        self.assertEqual(U.data[11, 0], 0.5)
+
+    def test_remove(self):
+        A = np.arange(30.).reshape((10, 3))
+        for in_place in (False, True):
+            U = la.NumpyVectorArray(A, copy=True)
+            U.remove([0, 3, 4, 9, 3], in_place=in_place)
+            self.assertTrue(np.all(U.data == np.delete(A, [0, 3, 4, 9], axis=0)))
+            self.assertEqual(U._array.shape[0], 10 if in_place else 6)
+        U = la.NumpyVectorArray(A, copy=True)
+        V = la.NumpyVectorArray.empty(3)
+        V.append(U, o_ind=[1, 2], remove_from_other=True)
+        self.assertTrue(np.all(V.data == A[1:3]))
+        self.assertTrue(np.all(U.data == np.delete(A, [1, 2], axis=0)))
+
+    def test_dtypes(self):
+        A = np.random.random((4, 5))
+        U = la.NumpyVectorArray.empty(5, dtype=np.float32)
+        U.append(la.NumpyVectorArray(A, dtype=np.float32))
+        self.assertEqual(U.dtype, np.float32)
+        G = U.gramian()
+        self.assertEqual(G.dtype, np.float64)
+        self.assertTrue(np.allclose(G, A.dot(A.T), rtol=1e-6))
+        self.assertEqual(la.gram_schmidt(U, check=False).dtype, np.float32)
+        for V in (U, la.MemmapVectorArray.empty(5, dtype=np.float32)):
+            V.append(la.NumpyVectorArray(A))
+            self.assertEqual(V.dtype, np.float32)
+            self.assertRaises(TypeError, V.append, la.NumpyVectorArray(A + 1j * A))
+        V = la.NumpyVectorArray(A + 1j * A)
+        self.assertTrue(np.allclose(V.prod(V), 2 * np.sum(A ** 2, axis=1)))
+        self.assertTrue(np.allclose(V.l2_norm(), np.sqrt(2 * np.sum(A ** 2, axis=1))))
+        C = np.random.randn(4, 10) + 1j * np.random.randn(4, 10)
+        for algorithm in (la.gram_schmidt, la.block_gram_schmidt):
+            W = algorithm(la.NumpyVectorArray(C.copy()), check=False)
+            self.assertTrue(np.allclose(W.gramian(), np.eye(4)))
+
+    def test_blocked_products(self):
+        block_bytes = la.NumpyVectorArray._block_bytes
+        la.NumpyVectorArray._block_bytes = 3 * 7 * 8
+        try:
+            A, B = np.random.random((10, 7)), np.random.random((10, 7))
+            U, V = la.NumpyVectorArray(A), la.NumpyVectorArray(B)
+            self.assertTrue(np.allclose(U.prod(V), np.sum(A * B, axis=1)))
+            self.assertTrue(np.allclose(U.prod(V, ind=[2], o_ind=range(10)), B.dot(A[2])))
+            self.assertTrue(np.allclose(U.prod(V, ind=[1, 5, 7], o_ind=range(2, 9), pairwise=False),
+                                        A[[1, 5, 7]].dot(B[2:9].T)))
+            self.assertTrue(np.allclose(U.gramian(), A.dot(A.T)))
+            self.assertTrue(np.allclose(U.gramian(ind=[9, 1, 3, 4]), A[[9, 1, 3, 4]].dot(A[[9, 1, 3, 4]].T)))
+            for p in (0, 1, 2, 3):
+                self.assertTrue(np.allclose(U.lp_norm(p), np.linalg.norm(A, ord=np.inf if p == 0 else p, axis=1)))
+        finally:
+            la.NumpyVectorArray._block_bytes = block_bytes
+
+    def test_shallow_copy(self):
+        A = np.random.random((6, 4))
+        U = la.NumpyVectorArray(A.copy())
+        V = U.copy(ind=xrange(1, 4), deep=False)
+        W = V.copy(ind=[0], deep=False)
+        self.assertTrue(np.may_share_memory(V.data, U.data))
+        U.iadd_mult(U, factor=2., o_factor=1.)
+        self.assertTrue(np.allclose(U.data, 3 * A))
+        self.assertTrue(np.allclose(V.data, A[1:4]))
+        self.assertTrue(np.allclose(W.data, A[1:2]))
+        W.iadd_mult(None, factor=0., o_factor=0.)
+        self.assertTrue(np.all(W.data == 0))
+        self.assertTrue(np.allclose(V.data, A[1:4]))
+        self.assertTrue(np.allclose(U.lincomb(np.array([1., 2.]), ind=[0, 2]).data, 3 * (A[0] + 2 * A[2])))
+
+    def test_pickle_shallow_copy(self):
+        A = np.random.random((6, 4))
+        U = la.NumpyVectorArray(A.copy())
+        V = U.copy(ind=xrange(1, 3), deep=False)
+        U2, V2 = pickle.loads(pickle.dumps(U, -1)), pickle.loads(pickle.dumps(V, -1))
+        self.assertTrue(np.all(U2.data == A))
+        self.assertTrue(np.all(V2.data == A[1:3]))
+        self.assertEqual(V2._array.shape, (2, 4))
+        V2.iadd_mult(None, factor=0., o_factor=0.)
+        U.iadd_mult(None, factor=2., o_factor=0.)
+        self.assertTrue(np.all(V2.data == 0))
+        self.assertTrue(np.all(U2.data == A))
+        self.assertTrue(np.allclose(V.data, A[1:3]))
+
+    def test_axpy_lincomb(self):
+        A, B, C = np.random.random((6, 5)), np.random.random((3, 5)), np.random.random((2, 3))
+        U = la.NumpyVectorArray(A.copy())
+        U.axpy(2., la.NumpyVectorArray(B), ind=[1, 3, 5])
+        U.iadd_lincomb(C, la.NumpyVectorArray(B), ind=[4, 0])
+        U.iadd_mult(U, factor=2., o_factor=-1., ind=[2], o_ind=[2])
+        E = A.copy()
+        E[[1, 3, 5]] += 2. * B
+        E[[4, 0]] += C.dot(B)
+        self.assertTrue(np.allclose(U.data, E))
+        R = U.add_mult(U, factor=3., o_factor=-1., ind=xrange(4), o_ind=[5, 4, 3, 2])
+        self.assertTrue(np.allclose(R.data, 3. * E[:4] - E[[5, 4, 3, 2]]))
+
+    def test_block_gram_schmidt(self):
+        A = np.random.random((20, 50))
+        A[5] = A[2]
+        A[11] = A[0] - A[3]
+        A[17] = 1. / (np.arange(50) + 1.) + 1e-9 * A[16]
+        A[18] = 1. / (np.arange(50) + 1.)
+        U = la.block_gram_schmidt(la.NumpyVectorArray(A.copy()), block_size=4, check=False)
+        V = la.gram_schmidt(la.NumpyVectorArray(A.copy()), check=False)
+        self.assertEqual(len(U), 17)
+        self.assertTrue(np.allclose(U.gramian(), np.eye(17)))
+        self.assertTrue(np.allclose(U.data[:16], V.data[:16]))
+        W = la.block_gram_schmidt(la.NumpyVectorArray(np.vstack((U.data[:8], A[8:]))), offset=8, block_size=3)
+        self.assertTrue(np.allclose(W.data, U.data))
+
+    def test_gram_schmidt_product_images(self):
+        from pymor.operators import NumpyLinearOperator
+
+        class CountingOperator(NumpyLinearOperator):
+            applications = 0
+
+            def apply(self, U, ind=None, mu=None):
+                CountingOperator.applications += len(U) if ind is None else len(ind)
+                return super(CountingOperator, self).apply(U, ind=ind, mu=mu)
+
+        M = np.random.random((30, 30))
+        product = CountingOperator(M.dot(M.T) + np.eye(30))
+        A = np.random.random((10, 30))
+        for algorithm in (la.gram_schmidt, la.block_gram_schmidt):
+            CountingOperator.applications = 0
+            U = algorithm(la.NumpyVectorArray(A.copy()), product=product, reuse_product=True, check=False)
+            self.assertEqual(CountingOperator.applications, 10)
+            V = algorithm(la.NumpyVectorArray(A.copy()), product=product, check=True)
+            self.assertTrue(np.allclose(U.data, V.data))
+
+    def test_duplicate_indices(self):
+        A = np.random.random((50, 20))
+        A[[7, 31]] = A[3]
+        A[12] = A[30] * (1 + 1e-15)
+        A[40] = A[39] * (1 + 1e-8)
+        A[[20, 25]] = 0
+        U = la.NumpyVectorArray(A)
+        self.assertEqual(la.duplicate_indices(U), [7, 25, 30, 31])
+        self.assertEqual(la.duplicate_indices(U, offset=31), [31])
+
+    def test_duplicate_indices_tolerance_edge(self):
+        from pymor.core import defaults
+        from pymor.tools import float_cmp
+        tol = defaults.float_cmp_tol
+        x = np.random.uniform(-1e3, 1e3, size=50)
+        y = x + np.sign(x) * (tol + tol * np.abs(x)) * 1.5
+        for k in xrange(len(x)):
+            while not float_cmp(x[k], y[k]):
+                y[k] = np.nextafter(y[k], x[k])
+        U = la.NumpyVectorArray(np.hstack((x, y))[:, np.newaxis])
+        self.assertEqual(la.duplicate_indices(U), range(50, 100))
+
+    def test_gram_schmidt_basis_extension(self):
+        from pymor.algorithms import basisextension, GramSchmidtBasisExtension, gram_schmidt_basis_extension
+        from pymor.operators import NumpyLinearOperator
+        M = np.random.random((30, 30))
+        product = NumpyLinearOperator(M.dot(M.T) + np.eye(30))
+        extension = GramSchmidtBasisExtension(product=product, reserve=5)
+        basis = reference = None
+        for _ in xrange(8):
+            U = la.NumpyVectorArray(np.random.random((1, 30)))
+            previous = basis
+            basis = extension(basis, U)
+            reference = gram_schmidt_basis_extension(reference, U, product=product)
+        self.assertEqual(len(previous), 7)
+        self.assertTrue(np.allclose(basis.data, reference.data))
+        self.assertTrue(np.all(pickle.loads(pickle.dumps(basis, -1)).data == basis.data))
+        self.assertEqual(extension.coefficients.shape, (1, 7))
+        self.assertLess(extension.orthonormality_error, 1e-10)
+        with self.assertRaises(basisextension.ExtensionError):
+            extension(basis, basis.lincomb(np.ones(8)))
+        self.assertLess(extension.norms[0], 1e-10)
+        self.assertEqual(len(extension(basis, la.NumpyVectorArray(np.random.random((2, 30))))), 10)
+        self.assertEqual(extension.gramian.shape, (10, 10))
+        W = la.NumpyVectorArray(np.random.random((3, 30)))
+        coefficients, norms = la.orthonormalize_against(W, extension.basis, product=product)
+        self.assertEqual(coefficients.shape, (3, 10))
+        self.assertTrue(np.allclose(product.apply2(extension.basis, W, pairwise=False), 0))
+        self.assertTrue(np.allclose(product.apply2(W, W, pairwise=False), np.eye(3)))
+
+    def test_pod(self):
+        from pymor.algorithms import pod, pod_basis_extension
+        A = np.random.random((40, 6)).dot(np.diag(2. ** -np.arange(6))).dot(np.random.random((6, 100)))
+        singular_values = np.linalg.svd(A, compute_uv=False)
+        U = la.NumpyVectorArray(A)
+        for method in ('snapshots', 'randomized'):
+            POD, s = pod(U, modes=4, method=method)
+            self.assertTrue(np.allclose(s, singular_values[:4]))
+            self.assertTrue(np.allclose(POD.gramian(), np.eye(4)))
+            POD, s = pod(U, modes=10, energy_tol=1e-4, method=method)
+            self.assertEqual(len(POD), np.flatnonzero(np.cumsum(singular_values[::-1] ** 2)[::-1]
+                                                      <= 1e-4 * np.sum(singular_values ** 2))[0])
+        self.assertEqual(len(pod(U)[0]), 6)
+        basis = pod_basis_extension(None, U, modes=2)
+        basis = pod_basis_extension(basis, U, modes=3)
+        self.assertEqual(len(basis), 5)
+        self.assertTrue(np.allclose(basis.gramian(), np.eye(5)))
+
+
+class TestMemmapVectorArray(TestBase):
+
+    def test_chunked_operations(self):
+        chunk_bytes = la.MemmapVectorArray.chunk_bytes
+        la.MemmapVectorArray.chunk_bytes = 3 * 7 * 8
+        try:
+            A, B = np.random.random((10, 7)), np.random.random((10, 7))
+            U = la.MemmapVectorArray.empty(7)
+            for i in range(10):
+                U.append(la.NumpyVectorArray(A[i]))
+            V = la.NumpyVectorArray(B)
+            self.assertTrue(np.allclose(U.data, A))
+            self.assertTrue(np.allclose(U.prod(V), np.sum(A * B, axis=1)))
+            self.assertTrue(np.allclose(U.prod(U, ind=[1, 5, 7], o_ind=range(2, 9), pairwise=False),
+                                        A[[1, 5, 7]].dot(A[2:9].T)))
+            self.assertTrue(np.allclose(U.l2_norm(), np.sqrt(np.sum(A ** 2, axis=1))))
+            F = np.random.random((4, 10))
+            self.assertTrue(np.allclose(U.lincomb(F).data, F.dot(A)))
+            self.assertTrue(np.allclose(U.add_mult(V, 2., 3., o_ind=[3]).data, 2 * A + 3 * B[3]))
+            self.assertTrue(np.all(U.almost_equal(U.copy())))
+            U.remove([0, 4, 5, 9])
+            self.assertTrue(np.all(U.data == np.delete(A, [0, 4, 5, 9], axis=0)))
+            U.replace(U, ind=[0, 1, 2], o_ind=[2, 1, 0])
+            U.replace(U, o_ind=range(5, -1, -1))
+            self.assertTrue(np.all(U.data == A[[8, 7, 6, 1, 2, 3]]))
+            V = pickle.loads(pickle.dumps(U, -1))
+            self.assertIsInstance(V, la.MemmapVectorArray)
+            self.assertTrue(np.all(V.data == A[[8, 7, 6, 1, 2, 3]]))
+        finally:
+            la.MemmapVectorArray.chunk_bytes = chunk_bytes
+
+
+class TestSparseVectorArray(TestBase):
+
+    def test_kernels(self):
+        A, B = np.zeros((4, 20)), np.zeros((2, 20))
+        A[[0, 1, 3], [2, 5, 5]] = 1.
+        A[2, :] = np.arange(20.)
+        B[[0, 1], [5, 7]] = 2.
+        U, V = la.SparseVectorArray(A), la.SparseVectorArray(B)
+        self.assertEqual(U.nnz, 22)
+        self.assertTrue(np.allclose(U.prod(la.NumpyVectorArray(B), pairwise=False), A.dot(B.T)))
+        self.assertTrue(np.allclose(U.prod(V, ind=[1, 3]), np.sum(A[[1, 3]] * B, axis=1)))
+        self.assertTrue(np.allclose(U.l2_norm(), np.sqrt(np.sum(A**2, axis=1))))
+        R = U.add_mult(V, 2., 3., ind=[0], o_ind=[0])
+        self.assertIsInstance(R, la.SparseVectorArray)
+        self.assertTrue(np.allclose(R.data, 2. * A[0] + 3. * B[0]))
+        self.assertIsInstance(U.lincomb(np.ones(4)), la.NumpyVectorArray)
+        U.iadd_mult(V, o_factor=-1., ind=[1, 3])
+        self.assertTrue(np.all(U.almost_equal(la.NumpyVectorArray(np.vstack([A[0], A[1] - B[0], A[2], A[3] - B[1]])))))
+
+
+class TestBlockVectorArray(TestBase):
+
+    def test_blockwise(self):
+        A, B = np.random.random((4, 3)), np.random.random((4, 5))
+        blocks = [la.NumpyVectorArray(A.copy()), la.NumpyVectorArray(B.copy())]
+        U = la.BlockVectorArray(blocks)
+        self.assertIs(U.block(1), blocks[1])
+        self.assertEqual((len(U), U.dim, U.block_dims), (4, 8, (3, 5)))
+        C = np.hstack((A, B))
+        self.assertTrue(np.allclose(U.gramian(), C.dot(C.T)))
+        for p in (0, 1, 2):
+            self.assertTrue(np.allclose(U.lp_norm(p), la.NumpyVectorArray(C).lp_norm(p)))
+        V = U.lincomb(np.eye(4)[::-1])
+        self.assertTrue(np.allclose(V.data, C[::-1]))
+        U.axpy(2., V, ind=[0, 1], x_ind=[0, 1])
+        C[:2] += 2. * C[[3, 2]]
+        self.assertTrue(np.allclose(U.block(0).data, C[:, :3]))
+        self.assertTrue(np.allclose(U.prod(V, pairwise=False), C.dot(V.data.T)))
+        U.append(V, o_ind=[3])
+        self.assertTrue(np.all(U.almost_equal(V, ind=[4], o_ind=[3])))
+
+
+class TestDistributedVectorArray(TestBase):
+
+    def test_reductions(self):
+        pool = la.LocalWorkerPool(3)
+        try:
+            A, B = np.random.random((5, 10)), np.random.random((3, 10))
+            U, V = la.DistributedVectorArray.from_numpy(A, pool), la.DistributedVectorArray.from_numpy(B, pool)
+            self.assertEqual(len(U), 5)
+            self.assertTrue(np.allclose(U.prod(V, ind=[0, 1, 2]), np.sum(A[:3] * B, axis=1)))
+            self.assertTrue(np.allclose(U.gramian(), A.dot(A.T)))
+            for p in (0, 1, 2):
+                self.assertTrue(np.allclose(U.lp_norm(p), la.NumpyVectorArray(A).lp_norm(p)))
+            self.assertTrue(np.allclose(U.lincomb(B[:, :5]).data, B[:, :5].dot(A)))
+            U.append(V, o_ind=[1])
+            U.axpy(2., V, ind=[0], x_ind=[2])
+            self.assertEqual(len(U), 6)
+            self.assertTrue(np.all(U.almost_equal(V, ind=[5], o_ind=[1])))
+            self.assertTrue(np.allclose(U.data, np.vstack([A[0] + 2. * B[2], A[1:], B[1]])))
+            U.disable_communication()
+            with self.assertRaises(la.interfaces.CommunicationError):
+                U.data
+        finally:
+            pool.close()
+
+
 if __name__ == "__main__":
     runmodule(name='pymortests.la')